@@ -1,32 +1,10 @@
 import streamlit as st
-import joblib
-import re
-import emoji
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
+from model_registry import get_engine
 
 # -----------------------------
 # Load model & vectorizer
 # -----------------------------
-model = joblib.load("models/Logistic_Regression.pkl")
-vectorizer = joblib.load("models/tfidf_vectorizer.pkl")
-
-# -----------------------------
-# Text cleaning function
-# -----------------------------
-stop_words = set(stopwords.words('english'))
-lemmatizer = WordNetLemmatizer()
-
-def clean_text(text):
-    text = text.lower()
-    text = re.sub(r'http\S+|www\S+', '', text)
-    text = emoji.replace_emoji(text, replace='')
-    text = re.sub(r'[^a-z\s]', '', text)
-
-    words = text.split()
-    words = [lemmatizer.lemmatize(w) for w in words if w not in stop_words]
-
-    return " ".join(words)
+engine = get_engine("models/Logistic_Regression.pkl", sentiment=False)
 
 # -----------------------------
 # UI DESIGN
@@ -42,11 +20,8 @@ if st.button("Check Comment"):
     if comment.strip() == "":
         st.warning("Please enter a comment.")
     else:
-        cleaned = clean_text(comment)
-        vectorized = vectorizer.transform([cleaned])
-        prediction = model.predict(vectorized)[0]
-
-        if prediction == 1:
+        # the engine's score is one class's probability here: block on the label
+        if engine.harmful(comment):
             st.error("⚠️ Bullying Content Detected")
         else:
             st.success("✅ Safe Comment")
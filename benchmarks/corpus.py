@@ -0,0 +1,56 @@
+import os
+import random
+import pandas as pd
+
+RAW_PATH = "data/raw/cyberbullying_tweets.csv"
+
+# ---------------- SYNTHETIC CHAT ----------------
+SAFE_WORDS = [
+    "hello", "everyone", "great", "stream", "love", "this", "song", "nice", "video",
+    "thanks", "watching", "from", "india", "what", "game", "are", "you", "playing",
+    "awesome", "content", "keep", "going", "lol", "that", "was", "funny", "good", "night",
+]
+TOXIC_WORDS = [
+    "stupid", "idiot", "hate", "die", "loser", "ugly", "dumb", "trash", "shut", "up",
+    "nobody", "likes", "you", "go", "back", "school", "fat", "girls", "religion",
+]
+EXTRAS = ["🔥", "😂", "❤️", "!!!", "?", "http://t.co/abc123", "@user", "#live", "2024", "..."]
+
+
+def synthetic_comments(n, seed=42, toxic_ratio=0.2):
+    rng = random.Random(seed)
+    comments = []
+
+    for _ in range(n):
+        vocab = TOXIC_WORDS if rng.random() < toxic_ratio else SAFE_WORDS
+        words = [rng.choice(vocab) for _ in range(rng.randint(3, 25))]
+
+        if rng.random() < 0.5:
+            words.insert(rng.randrange(len(words) + 1), rng.choice(EXTRAS))
+
+        comments.append(" ".join(words))
+
+    return comments
+
+
+# ---------------- DATASET ----------------
+def dataset_comments(n=None, path=RAW_PATH, seed=42):
+    if not os.path.exists(path):
+        return None
+
+    texts = pd.read_csv(path).iloc[:,0].fillna("").astype(str).tolist()
+
+    if n is not None and n < len(texts):
+        texts = random.Random(seed).sample(texts, n)
+
+    return texts
+
+
+def corpora(n, path=RAW_PATH):
+    found = {"synthetic": synthetic_comments(n)}
+
+    dataset = dataset_comments(n, path)
+    if dataset is not None:
+        found["dataset"] = dataset
+
+    return found
@@ -0,0 +1,77 @@
+# Regex chain vs the translate-based obfuscation normalizer.
+#
+#   python -m benchmarks.normalizer --n 2000 --output bench_normalizer.json
+#
+# Times per-comment cost of cleaning.tokenize (lower, URL regex,
+# emoji.replace_emoji, non-letter regex, split) and
+# cleaning.ObfuscationNormalizer.tokenize (lower, one translate, one ASCII
+# encode, split, cached per-token de-obfuscation), on plain and on
+# obfuscated comments. "words" stops before stop-word removal and
+# lemmatization, which both paths share; "tokens" is the full call. The
+# lemma cache is warmed first, so both are measured at steady state.
+import argparse
+import json
+import emoji
+from cleaning import URL_RE, NON_ALPHA_RE, ObfuscationNormalizer, tokenize
+from moderation import VECTORIZER_PATH, load_vectorizer, vectorizer_words
+from evaluate_obfuscation import obfuscate
+from benchmarks.corpus import corpora
+from benchmarks.timing import batches, time_batches, summarize, run_info
+
+
+def regex_words(text):
+    text = URL_RE.sub('', str(text).lower())
+    text = emoji.replace_emoji(text, replace='')
+    return NON_ALPHA_RE.sub('', text).split()
+
+
+def per_comment(fn, texts):
+    return summarize(time_batches(lambda batch: [fn(t) for t in batch], batches(texts, 1)), len(texts))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vectorizer", default=VECTORIZER_PATH, help="source of the normalizer's lexicon")
+    parser.add_argument("--n", type=int, default=2000)
+    parser.add_argument("--rate", type=float, default=0.5, help="share of words obfuscated")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    normalizer = ObfuscationNormalizer(vectorizer_words(load_vectorizer(args.vectorizer)))
+    found = corpora(args.n)
+    plain = found.get("dataset", found["synthetic"])
+    inputs = {"plain": plain, "obfuscated": [obfuscate(t, args.rate) for t in plain]}
+
+    paths = {
+        "regex words": regex_words,
+        "normalizer words": normalizer.words,
+        "regex tokens": tokenize,
+        "normalizer tokens": normalizer.tokenize,
+    }
+
+    results = {}
+    for corpus, texts in inputs.items():
+        for fn in paths.values():
+            for t in texts:
+                fn(t)
+        results[corpus] = {name: per_comment(fn, texts) for name, fn in paths.items()}
+
+    report = {**run_info(), "n": len(plain), "rate": args.rate, "results": results}
+
+    for corpus, rows in results.items():
+        print(f"\n{corpus} comments")
+        print(f"{'':>18} {'p50 ms':>8} {'p99 ms':>8} {'comments/s':>11}")
+        for name, r in rows.items():
+            print(f"{name:>18} {r['p50_ms']:>8.4f} {r['p99_ms']:>8.4f} {r['comments_per_s']:>11,.0f}")
+        for stage in ("words", "tokens"):
+            speedup = rows[f"normalizer {stage}"]["comments_per_s"] / rows[f"regex {stage}"]["comments_per_s"]
+            print(f"  {stage}: normalizer {speedup:.2f}x the regex chain")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
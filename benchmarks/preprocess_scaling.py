@@ -0,0 +1,72 @@
+# Speedup of preprocess.py --stream versus number of worker processes.
+#
+#   python -m benchmarks.preprocess_scaling --rows 200000
+#
+# The lemma cache is cleared before every run: forked workers inherit the
+# parent's cache, so otherwise each streaming run would start with the
+# corpus already lemmatized by the run before it.
+import argparse
+import json
+import os
+import tempfile
+import time
+import pandas as pd
+from cleaning import clear_lemma_cache
+from preprocess import preprocess, preprocess_streaming, RAW_PATH
+from benchmarks.corpus import synthetic_comments
+
+
+def worker_counts(max_workers):
+    counts, w = [], 1
+    while w < max_workers:
+        counts.append(w)
+        w *= 2
+    return counts + [max_workers]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", default=RAW_PATH)
+    parser.add_argument("--rows", type=int, default=100000, help="synthetic rows if --input is missing")
+    parser.add_argument("--chunksize", type=int, default=10000)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count())
+    parser.add_argument("--json", default=None, help="write results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src = args.input
+        if not os.path.exists(src):
+            src = os.path.join(tmp, "raw.csv")
+            pd.DataFrame({"tweet_text": synthetic_comments(args.rows)}).to_csv(src, index=False)
+
+        dst = os.path.join(tmp, "clean.csv")
+
+        clear_lemma_cache()
+        start = time.perf_counter()
+        rows = len(preprocess(src, dst))
+        baseline = time.perf_counter() - start
+        print(f"in-memory, 1 core: {baseline:.2f}s ({rows / baseline:,.0f} rows/s)")
+
+        results = {"rows": rows, "cpu_count": os.cpu_count(), "in_memory_s": baseline, "streaming": []}
+
+        for workers in worker_counts(args.max_workers):
+            clear_lemma_cache()
+            start = time.perf_counter()
+            preprocess_streaming(src, dst, args.chunksize, workers)
+            elapsed = time.perf_counter() - start
+
+            results["streaming"].append({
+                "workers": workers,
+                "seconds": elapsed,
+                "rows_per_s": rows / elapsed,
+                "speedup": baseline / elapsed,
+            })
+            print(f"stream, {workers:>2} workers: {elapsed:.2f}s ({rows / elapsed:,.0f} rows/s, {baseline / elapsed:.2f}x)")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
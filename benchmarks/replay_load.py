@@ -0,0 +1,216 @@
+# Replays a comment CSV as live chat traffic through the moderation path.
+#
+#   python -m benchmarks.replay_load --rate 500 --duration 60 --shape burst
+#
+# A producer thread streams the CSV (in chunks, looping if needed) at the
+# requested arrival rate and burst shape; a consumer micro-batches whatever
+# is queued into ModerationEngine.score_batch. Reports sustained
+# throughput, queue backlog, p50/p99/p999 verdict latency (scheduled
+# arrival -> verdict) and how the safe/warn/block mix changes over time.
+# Latency starts at the time a comment was due, not when the producer got
+# to enqueue it, so a producer that falls behind (it shares the GIL with
+# the consumer) does not hide the wait (coordinated omission).
+import argparse
+import itertools
+import json
+import queue
+import random
+import threading
+import time
+from collections import Counter
+import numpy as np
+import pandas as pd
+from model_registry import get_engine
+from moderation import MODEL_PATH, VECTORIZER_PATH
+from benchmarks.corpus import RAW_PATH, synthetic_comments
+from benchmarks.timing import run_info
+
+
+# ---------------- TRAFFIC ----------------
+def stream_texts(path, chunksize=10000, loop=True):
+    while True:
+        found = 0
+        try:
+            for chunk in pd.read_csv(path, chunksize=chunksize):
+                found += len(chunk)
+                yield from chunk.iloc[:,0].fillna("").astype(str)
+        except (FileNotFoundError, pd.errors.EmptyDataError):
+            pass
+
+        if not found:
+            # a missing or empty CSV would otherwise loop forever without yielding
+            print(f"⚠️ No comments in {path}, replaying synthetic comments instead")
+            yield from itertools.cycle(synthetic_comments(10000))
+        if not loop:
+            return
+
+
+def arrival_rate(shape, rate, t, burst_factor=5.0, burst_period=10.0, burst_duty=0.2):
+    if shape == "burst" and (t % burst_period) < burst_period * burst_duty:
+        return rate * burst_factor
+    return rate
+
+
+def produce(texts, out, args, stop, start):
+    rng = random.Random(42)
+    next_at = start
+
+    for text in texts:
+        if stop.is_set() or next_at - start >= args.duration:
+            break
+
+        rate = arrival_rate(args.shape, args.rate, next_at - start, args.burst_factor, args.burst_period, args.burst_duty)
+        next_at += rng.expovariate(rate) if args.shape == "poisson" else 1 / rate
+
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+        # stamped with the scheduled arrival, however late the put happens
+        out.put((text, next_at))
+
+
+# ---------------- MODERATION ----------------
+def consume(engine, inbox, args, stats, producer_done):
+    max_wait = args.max_wait_ms / 1000
+
+    while True:
+        try:
+            first = inbox.get(timeout=0.1)
+        except queue.Empty:
+            if producer_done.is_set():
+                return
+            continue
+
+        batch = [first]
+        deadline = time.perf_counter() + max_wait
+        while len(batch) < args.max_batch_size:
+            try:
+                batch.append(inbox.get(timeout=max(0, deadline - time.perf_counter())))
+            except queue.Empty:
+                break
+
+        results = engine.score_batch([text for text, _ in batch])
+        done = time.perf_counter()
+
+        for (_, enqueued), result in zip(batch, results):
+            stats["latencies"].append(done - enqueued)
+            stats["verdicts"].append((done, result.verdict))
+        stats["batches"] += 1
+
+
+def sample_backlog(inbox, stats, stop, interval=0.1):
+    while not stop.is_set():
+        stats["backlog"].append((time.perf_counter(), inbox.qsize()))
+        time.sleep(interval)
+
+
+def verdict_windows(verdicts, start, window):
+    buckets = {}
+    for at, verdict in verdicts:
+        buckets.setdefault(int((at - start) // window), Counter())[verdict] += 1
+
+    rows = []
+    for i in sorted(buckets):
+        counts = buckets[i]
+        total = sum(counts.values())
+        rows.append({
+            "t_start_s": i * window,
+            "comments": total,
+            **{v: counts[v] / total for v in ("safe", "warn", "block")},
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--csv", default=RAW_PATH)
+    parser.add_argument("--rate", type=float, default=200, help="mean arrivals per second")
+    parser.add_argument("--duration", type=float, default=30, help="seconds of traffic")
+    parser.add_argument("--shape", choices=["constant", "poisson", "burst"], default="poisson")
+    parser.add_argument("--burst-factor", type=float, default=5.0)
+    parser.add_argument("--burst-period", type=float, default=10.0, help="seconds between burst starts")
+    parser.add_argument("--burst-duty", type=float, default=0.2, help="fraction of each period spent bursting")
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--window", type=float, default=5.0, help="seconds per verdict-mix window")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--vectorizer", default=VECTORIZER_PATH)
+    parser.add_argument("--no-sentiment", action="store_true")
+    parser.add_argument("--near-duplicates", action="store_true", help="reuse scores of recent near-duplicate comments")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    engine = get_engine(args.model, args.vectorizer, sentiment=not args.no_sentiment)
+    if args.near_duplicates:
+        engine.enable_near_duplicates()
+
+    inbox = queue.Queue()
+    stop, producer_done = threading.Event(), threading.Event()
+    stats = {"latencies": [], "verdicts": [], "backlog": [], "batches": 0}
+
+    print(f"🚀 Replaying {args.csv} at {args.rate:g}/s ({args.shape}) for {args.duration:g}s...")
+
+    start = time.perf_counter()
+    consumer = threading.Thread(target=consume, args=(engine, inbox, args, stats, producer_done))
+    sampler = threading.Thread(target=sample_backlog, args=(inbox, stats, stop), daemon=True)
+    consumer.start()
+    sampler.start()
+
+    try:
+        produce(stream_texts(args.csv), inbox, args, stop, start)
+    except KeyboardInterrupt:
+        stop.set()
+    produce_end = time.perf_counter()
+
+    producer_done.set()
+    consumer.join()
+    stop.set()
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array(stats["latencies"]) * 1000
+    backlog = np.array([size for _, size in stats["backlog"]] or [0])
+    processed = len(latencies)
+
+    report = {
+        **run_info(),
+        "config": vars(args),
+        "comments": processed,
+        "offered_rate": processed / (produce_end - start),
+        "throughput": processed / elapsed,
+        "drain_s": elapsed - (produce_end - start),
+        "batches": stats["batches"],
+        "avg_batch_size": processed / stats["batches"] if stats["batches"] else 0.0,
+        "backlog_max": int(backlog.max()),
+        "backlog_mean": float(backlog.mean()),
+        "latency_ms": {
+            name: float(np.percentile(latencies, p)) if processed else None
+            for name, p in (("p50", 50), ("p99", 99), ("p999", 99.9))
+        },
+        "verdict_mix": verdict_windows(stats["verdicts"], start, args.window),
+    }
+    if engine.near_duplicates is not None:
+        report["near_duplicates"] = {**engine.near_duplicates.stats(), "raids": engine.near_duplicates.raids()}
+
+    lat = report["latency_ms"]
+    print(f"\nProcessed {processed} comments in {elapsed:.1f}s → {report['throughput']:,.0f}/s sustained")
+    print(f"Backlog: max {report['backlog_max']}, mean {report['backlog_mean']:.1f}, drain {report['drain_s']:.2f}s")
+    if processed:
+        print(f"Latency: p50 {lat['p50']:.2f}ms  p99 {lat['p99']:.2f}ms  p999 {lat['p999']:.2f}ms")
+    if "near_duplicates" in report:
+        nd = report["near_duplicates"]
+        print(f"Near-duplicates: {nd['hit_rate']:.0%} reused ({nd['exact_hits']} exact, {nd['near_hits']} near, "
+              f"{nd['near_rejected']} near matches scored again), "
+              f"{len(nd['raids'])} raid clusters")
+    for row in report["verdict_mix"]:
+        print(f"  t={row['t_start_s']:>5.0f}s  n={row['comments']:>6}  "
+              f"safe {row['safe']:.0%}  warn {row['warn']:.0%}  block {row['block']:.0%}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
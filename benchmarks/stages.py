@@ -0,0 +1,127 @@
+# Per-stage latency/throughput of the moderation path.
+#
+#   python -m benchmarks.stages --n 2000 --batch-sizes 1,8,64,512 --output bench_stages.json
+#
+# Every stage is timed on its own input (the output of the previous
+# stage), per batch, and reported as p50/p99 batch latency and
+# comments/sec. Results are JSON so runs can be diffed across commits.
+import argparse
+import glob
+import json
+import os
+import joblib
+import emoji
+from cleaning import URL_RE, NON_ALPHA_RE, normalize_word, lemma_cache_stats, clear_lemma_cache
+from moderation import ml_scores, load_sentiment, VECTORIZER_PATH
+from benchmarks.corpus import corpora, RAW_PATH
+from benchmarks.timing import batches, time_batches, summarize, run_info
+
+# the streaming model (train_streaming.py) reads hashed features, not the
+# TF-IDF matrix every other model here is timed on
+NON_MODEL_ARTIFACTS = {
+    "tfidf_vectorizer.pkl", "X_features.pkl", "y_labels.pkl",
+    "hashing_vectorizer.pkl", "streaming_model.pkl", "streaming_checkpoint.pkl",
+}
+
+
+# ---------------- CLEAN_TEXT STAGES ----------------
+def lemmatize(texts):
+    return [" ".join(w for w in map(normalize_word, t.split()) if w is not None) for t in texts]
+
+
+def lemmatize_cold(texts):
+    # every batch starts with an empty lemma cache, so repeated words only
+    # hit within the batch; lemmatize.warm runs on a cache filled with the
+    # whole corpus
+    clear_lemma_cache()
+    return lemmatize(texts)
+
+
+def stage_inputs(texts):
+    # stage -> (inputs, timed fn, untimed setup run before it or None)
+    lowered = [str(t).lower() for t in texts]
+    no_urls = [URL_RE.sub('', t) for t in lowered]
+    no_emoji = [emoji.replace_emoji(t, replace='') for t in no_urls]
+    alpha = [NON_ALPHA_RE.sub('', t) for t in no_emoji]
+    cleaned = lemmatize(alpha)
+
+    return {
+        "clean.url_regex": (lowered, lambda b: [URL_RE.sub('', t) for t in b], None),
+        "clean.emoji": (no_urls, lambda b: [emoji.replace_emoji(t, replace='') for t in b], None),
+        "clean.non_alpha_regex": (no_emoji, lambda b: [NON_ALPHA_RE.sub('', t) for t in b], None),
+        "clean.lemmatize.cold": (alpha, lemmatize_cold, None),
+        # the cold stage cleared the cache: fill it with the whole corpus again
+        "clean.lemmatize.warm": (alpha, lemmatize, lambda: lemmatize(alpha)),
+    }, cleaned
+
+
+def load_models(models_dir):
+    models = {}
+    for path in sorted(glob.glob(os.path.join(models_dir, "*.pkl"))):
+        name = os.path.basename(path)
+        if name in NON_MODEL_ARTIFACTS:
+            continue
+        model = joblib.load(path)
+        if hasattr(model, "predict"):
+            models[name] = model
+    return models
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=2000, help="comments per corpus")
+    parser.add_argument("--batch-sizes", default="1,8,64,512")
+    parser.add_argument("--dataset", default=RAW_PATH)
+    parser.add_argument("--models-dir", default="models")
+    parser.add_argument("--vectorizer", default=VECTORIZER_PATH)
+    parser.add_argument("--output", default=None, help="write JSON results here (default: stdout)")
+    args = parser.parse_args()
+
+    batch_sizes = [int(b) for b in args.batch_sizes.split(",")]
+    vectorizer = joblib.load(args.vectorizer)
+    models = load_models(args.models_dir)
+    sentiment_ai = load_sentiment()
+
+    results = []
+    lemma_cache = {}
+
+    def record(corpus, stage, size, items, fn):
+        latencies = time_batches(fn, batches(items, size))
+        row = {"corpus": corpus, "stage": stage, "batch_size": size, **summarize(latencies, len(items))}
+        results.append(row)
+        print(f"{corpus:<10} {stage:<34} bs={size:<4} p50={row['p50_ms']:8.3f}ms "
+              f"p99={row['p99_ms']:8.3f}ms {row['comments_per_s']:>12,.0f}/s")
+
+    for corpus, texts in corpora(args.n, args.dataset).items():
+        clear_lemma_cache()
+        stages, cleaned = stage_inputs(texts)
+        # one pass over this corpus, before the cold stage clears the cache
+        lemma_cache[corpus] = lemma_cache_stats()
+        X = vectorizer.transform(cleaned)
+
+        for size in batch_sizes:
+            for stage, (inputs, fn, setup) in stages.items():
+                if setup is not None:
+                    setup()
+                record(corpus, stage, size, inputs, fn)
+
+            record(corpus, "tfidf.transform", size, cleaned, vectorizer.transform)
+
+            for name, model in models.items():
+                rows = list(range(X.shape[0]))
+                record(corpus, f"model.{name}", size, rows, lambda b, m=model: ml_scores(m, X[b[0]:b[-1] + 1]))
+
+            record(corpus, "vader", size, cleaned, lambda b: [sentiment_ai.polarity_scores(t) for t in b])
+
+    report = {**run_info(), "n": args.n, "lemma_cache": lemma_cache, "results": results}
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Results written to {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
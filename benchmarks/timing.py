@@ -0,0 +1,43 @@
+import platform
+import subprocess
+import time
+from datetime import datetime, timezone
+import numpy as np
+
+
+def batches(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def time_batches(fn, batch_list):
+    latencies = []
+    for batch in batch_list:
+        start = time.perf_counter()
+        fn(batch)
+        latencies.append(time.perf_counter() - start)
+    return np.array(latencies)
+
+
+def summarize(latencies, comments, percentiles=(50, 99)):
+    total = float(latencies.sum())
+    summary = {f"p{p}_ms": float(np.percentile(latencies, p)) * 1000 for p in percentiles}
+    summary["comments_per_s"] = comments / total if total else float("inf")
+    summary["batches"] = len(latencies)
+    return summary
+
+
+def run_info():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+    }
@@ -0,0 +1,106 @@
+# Joined cleaned strings vs token lists from cleaning.tokenize().
+#
+#   python -m benchmarks.token_lists --n 2000 --output bench_tokens.json
+#
+# The old serving path joins tokenize() output into a string and the
+# vectorizer splits it again with its regex; the new path hands the token
+# list straight to the n-gram builder. Both paths are timed per comment
+# on the sklearn vectorizer, the slim MappedVectorizer and the compiled
+# linear scorer, and must give identical results. Fitting a plain
+# TfidfVectorizer and a TokenTfidfVectorizer on the same cleaned texts
+# must also give the same vocabulary and idf.
+import argparse
+import json
+import tempfile
+import joblib
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from cleaning import tokenize
+from features import VECTORIZER_PARAMS
+from fast_model import export_vectorizer, load_vectorizer
+from linear_scorer import LinearNgramScorer
+from moderation import MODEL_PATH, VECTORIZER_PATH
+from token_vectorizer import TokenTfidfVectorizer
+from benchmarks.corpus import corpora
+from benchmarks.timing import batches, time_batches, summarize, run_info
+
+
+def fit_matches(texts):
+    plain = TfidfVectorizer(**VECTORIZER_PARAMS).fit(texts)
+    token = TokenTfidfVectorizer(**VECTORIZER_PARAMS).fit(texts)
+
+    return {
+        "vocabulary": plain.vocabulary_ == token.vocabulary_,
+        "idf": bool(np.array_equal(plain.idf_, token.idf_)),
+        "features": abs(plain.transform(texts) - token.transform(texts)).max() == 0,
+    }
+
+
+def compare(name, fn, cleaned, tokens, results, check):
+    old = summarize(time_batches(fn, batches(cleaned, 1)), len(cleaned))
+    new = summarize(time_batches(fn, batches(tokens, 1)), len(tokens))
+    results[name] = {
+        "joined": old,
+        "tokens": new,
+        "speedup": new["comments_per_s"] / old["comments_per_s"],
+        "identical": bool(check(fn(cleaned), fn(tokens))),
+    }
+
+
+def same_matrix(a, b):
+    return (a != b).nnz == 0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--vectorizer", default=VECTORIZER_PATH)
+    parser.add_argument("--n", type=int, default=2000)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    found = corpora(args.n)
+    texts = found.get("dataset", found["synthetic"])
+    tokens = [tokenize(t) for t in texts]
+    cleaned = [" ".join(t) for t in tokens]
+
+    model = joblib.load(args.model)
+    vectorizer = joblib.load(args.vectorizer)
+    if not isinstance(vectorizer, TokenTfidfVectorizer):
+        # artifacts from before token_vectorizer.py: same fitted state
+        # (vocabulary_, the idf held by _tfidf, ...)
+        upgraded = TokenTfidfVectorizer(**vectorizer.get_params())
+        upgraded.__dict__.update(vectorizer.__dict__)
+        vectorizer = upgraded
+
+    with tempfile.TemporaryDirectory() as slim_path:
+        export_vectorizer(vectorizer, slim_path)
+        # the arrays are memory-mapped, so copy them before the directory goes
+        mapped = load_vectorizer(slim_path)
+        mapped.terms, mapped.index, mapped.idf = (np.array(a) for a in (mapped.terms, mapped.index, mapped.idf))
+    scorer = LinearNgramScorer.compile(model, vectorizer)
+
+    results = {}
+    compare("sklearn transform", vectorizer.transform, cleaned, tokens, results, same_matrix)
+    compare("mapped transform", mapped.transform, cleaned, tokens, results, same_matrix)
+    compare("linear scorer", lambda docs: np.array([scorer.ml_score(d) for d in docs]),
+            cleaned, tokens, results, np.array_equal)
+
+    fit = fit_matches(cleaned)
+    report = {**run_info(), "n": len(texts), "results": results, "fit": fit}
+
+    print(f"\n{'':>18} {'joined/s':>10} {'tokens/s':>10} {'speedup':>8} {'identical':>10}")
+    for name, r in results.items():
+        print(f"{name:>18} {r['joined']['comments_per_s']:>10,.0f} {r['tokens']['comments_per_s']:>10,.0f} "
+              f"{r['speedup']:>7.2f}x {str(r['identical']):>10}")
+    print("\nTokenTfidfVectorizer fit vs TfidfVectorizer: "
+          + ", ".join(f"{k} {'same' if v else 'DIFFERENT'}" for k, v in fit.items()))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
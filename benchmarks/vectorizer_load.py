@@ -0,0 +1,82 @@
+# Pickled TfidfVectorizer vs the slim array export (fast_model.export_vectorizer).
+#
+#   python -m benchmarks.vectorizer_load --output bench_vectorizer.json
+#
+# Reports artifact size, cold load time, Python heap allocated by the load
+# (memory-mapped arrays live in the page cache and are not counted),
+# per-comment transform latency and the largest difference between the
+# two transforms on the same comments.
+import argparse
+import json
+import os
+import time
+import tracemalloc
+import joblib
+from cleaning import clean_text
+from fast_model import export_vectorizer, load_vectorizer
+from moderation import VECTORIZER_PATH, slim_vectorizer_path
+from benchmarks.corpus import synthetic_comments
+from benchmarks.timing import batches, time_batches, summarize, run_info
+
+
+def artifact_bytes(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+    return os.path.getsize(path)
+
+
+def measure_load(load, path, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        load(path)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    vectorizer = load(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return vectorizer, {"load_ms": best * 1000, "heap_peak_bytes": peak, "artifact_bytes": artifact_bytes(path)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vectorizer", default=VECTORIZER_PATH)
+    parser.add_argument("--n", type=int, default=2000, help="comments to transform")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    slim_path = slim_vectorizer_path(args.vectorizer)
+    if not os.path.exists(os.path.join(slim_path, "vectorizer.json")):
+        print(f"Exporting {args.vectorizer} to {slim_path}...")
+        export_vectorizer(joblib.load(args.vectorizer), slim_path)
+
+    texts = [clean_text(t) for t in synthetic_comments(args.n)]
+    results = {}
+    transforms = {}
+
+    for name, load, path in [("pickle", joblib.load, args.vectorizer), ("slim", load_vectorizer, slim_path)]:
+        vectorizer, row = measure_load(load, path, args.repeat)
+        row.update(summarize(time_batches(vectorizer.transform, batches(texts, 1)), len(texts)))
+        results[name] = row
+        transforms[name] = vectorizer.transform(texts)
+
+    drift = abs(transforms["pickle"] - transforms["slim"]).max()
+    report = {**run_info(), "vectorizer": args.vectorizer, "results": results, "max_abs_drift": float(drift)}
+
+    print(f"\n{'':>7} {'size KB':>9} {'load ms':>9} {'heap KB':>9} {'p50 ms':>8} {'comments/s':>11}")
+    for name, r in results.items():
+        print(f"{name:>7} {r['artifact_bytes']/1024:>9.0f} {r['load_ms']:>9.2f} {r['heap_peak_bytes']/1024:>9.0f} "
+              f"{r['p50_ms']:>8.3f} {r['comments_per_s']:>11,.0f}")
+    print(f"\nMax transform difference: {drift:.2e}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# Two-tier early-exit scoring.
+#
+# A fast linear model scores every comment. Only comments whose serving
+# score (ML score + the VADER aggression boost, which ModerationEngine
+# passes in) falls inside the uncertain band around the safe/warn/block
+# cutoffs are re-scored by the heavy model (Random Forest / MLP);
+# everything else keeps the fast verdict. ModerationEngine picks this up
+# through the ml_scores() hook in moderation.py.
+import time
+import numpy as np
+import moderation
+from moderation import ml_scores
+
+# the band covers both cutoffs with some margin on each side: from
+# SAFE_MAX * low to WARN_MAX * high. Only the margins are stored (and
+# pickled); the band follows the cutoffs in effect when scoring, so
+# cutoffs swept later by evaluate_model.py move it too.
+DEFAULT_MARGINS = (0.5, 1.5)
+
+
+class CascadeModel:
+
+    def __init__(self, fast, heavy, margins=DEFAULT_MARGINS):
+        self.fast = fast
+        self.heavy = heavy
+        self.margins = margins
+        self.classes_ = heavy.classes_
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.fast_rows = 0
+        self.heavy_rows = 0
+        self.fast_seconds = 0.0
+        self.heavy_seconds = 0.0
+
+    @property
+    def band(self):
+        # cascades pickled with a fixed band get the default margins
+        low, high = getattr(self, "margins", DEFAULT_MARGINS)
+        return moderation.SAFE_MAX * low, moderation.WARN_MAX * high
+
+    def uncertain(self, scores, boost=None):
+        # rows whose final score (what the cutoffs see) is near a cutoff
+        final = scores if boost is None else np.clip(scores + boost, 0, 1)
+        low, high = self.band
+        return np.flatnonzero((final >= low) & (final <= high))
+
+    def ml_scores(self, X, boost=None):
+        start = time.perf_counter()
+        scores = ml_scores(self.fast, X)
+        self.fast_seconds += time.perf_counter() - start
+        self.fast_rows += X.shape[0]
+
+        uncertain = self.uncertain(scores, boost)
+
+        if len(uncertain):
+            start = time.perf_counter()
+            scores = scores.copy()
+            scores[uncertain] = ml_scores(self.heavy, X[uncertain])
+            self.heavy_seconds += time.perf_counter() - start
+            self.heavy_rows += len(uncertain)
+
+        return scores
+
+    def predict(self, X, boost=None):
+        # class predictions follow the same tiering as the scores
+        pred = np.asarray(self.fast.predict(X), dtype=object)
+        uncertain = self.uncertain(ml_scores(self.fast, X), boost)
+        if len(uncertain):
+            pred[uncertain] = self.heavy.predict(X[uncertain])
+        return pred
+
+    def stats(self):
+        heavy_per_row = self.heavy_seconds / self.heavy_rows if self.heavy_rows else 0.0
+        exited = self.fast_rows - self.heavy_rows
+
+        return {
+            "comments": self.fast_rows,
+            "fast_only": exited,
+            "heavy": self.heavy_rows,
+            "heavy_rate": self.heavy_rows / self.fast_rows if self.fast_rows else 0.0,
+            "fast_seconds": self.fast_seconds,
+            "heavy_seconds": self.heavy_seconds,
+            # what the early exits would have cost on the heavy model
+            "est_seconds_saved": exited * heavy_per_row - self.fast_seconds,
+        }
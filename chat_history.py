@@ -0,0 +1,218 @@
+# Bounded chat history for the live apps.
+#
+# The visible window is a fixed-size ring buffer (collections.deque), so
+# memory and per-rerun render cost stay flat however long the stream
+# runs. Messages that fall out of the window spill to SQLite, indexed by
+# time and by user, and are paged back in on demand. Each message's HTML
+# is rendered once when it is appended and reused on every rerun.
+#
+# Spilled messages are written SPILL_BATCH at a time (and before any read),
+# so the UI thread commits once per batch, not once per message. Extra
+# fields such as likes are stored with the message and can still be
+# changed with update(). Every channel is a session, so messages older
+# than RETENTION_SECONDS are deleted, whatever their channel, when a
+# history first opens the file.
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+HISTORY_DB = "data/chat_history.sqlite3"
+WINDOW = 50
+PAGE_SIZE = 20
+SPILL_BATCH = 32
+RETENTION_SECONDS = float(os.environ.get("CHAT_HISTORY_RETENTION", 7 * 24 * 3600))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id      INTEGER PRIMARY KEY,
+    channel TEXT NOT NULL,
+    seq     INTEGER NOT NULL,
+    ts      REAL NOT NULL,
+    user    TEXT NOT NULL,
+    text    TEXT NOT NULL,
+    css     TEXT,
+    html    TEXT,
+    extra   TEXT
+);
+CREATE INDEX IF NOT EXISTS messages_channel_ts ON messages (channel, ts);
+CREATE INDEX IF NOT EXISTS messages_channel_user_ts ON messages (channel, user, ts);
+CREATE INDEX IF NOT EXISTS messages_ts ON messages (ts);
+"""
+
+COLUMNS = ("seq", "ts", "user", "text", "css", "html", "extra")
+BASE_FIELDS = set(COLUMNS) - {"extra"}
+SELECT = "SELECT seq, ts, user, text, css, html, extra FROM messages "
+
+
+def extra_json(message):
+    extra = {k: v for k, v in message.items() if k not in BASE_FIELDS}
+    return json.dumps(extra) if extra else None
+
+
+def message_row(row):
+    message = dict(zip(COLUMNS, row))
+    extra = message.pop("extra")
+    if extra:
+        message.update(json.loads(extra))
+    return message
+
+
+class ChatHistory:
+
+    def __init__(self, channel, db_path=HISTORY_DB, window=WINDOW, render=None,
+                 spill_batch=SPILL_BATCH, retention=RETENTION_SECONDS):
+        self.channel = channel
+        self.db_path = db_path
+        self.render = render
+        self.spill_batch = spill_batch
+        self.retention = retention
+        self.visible = deque(maxlen=window)
+        self.spilled = 0
+        self._pending = []
+        self._next_seq = 0
+        self._db = None
+        self._lock = threading.RLock()
+
+    # ---------------- STORAGE ----------------
+    def _conn(self):
+        # opened lazily: short streams never touch the disk
+        if self._db is None:
+            if os.path.dirname(self.db_path):
+                os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            # Streamlit reruns a session on different threads
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            # every session writes to the same file
+            self._db.execute("PRAGMA journal_mode=WAL")
+            columns = [col[1] for col in self._db.execute("PRAGMA table_info(messages)")]
+            if columns and "extra" not in columns:
+                # file written before extras were stored
+                self._db.execute("ALTER TABLE messages ADD COLUMN extra TEXT")
+            self._db.executescript(SCHEMA)
+            self.expire()
+        return self._db
+
+    def expire(self, now=None):
+        # delete messages of every channel older than the retention period
+        if self.retention is None:
+            return 0
+        now = time.time() if now is None else now
+        with self._conn() as db:
+            return db.execute("DELETE FROM messages WHERE ts < ?", (now - self.retention,)).rowcount
+
+    def _spill(self, message):
+        self._pending.append(message)
+        self.spilled += 1
+        if len(self._pending) >= self.spill_batch:
+            self._flush_spills()
+
+    def _flush_spills(self):
+        if not self._pending:
+            return
+        # written now, so likes changed while pending are kept
+        rows = [
+            (self.channel, m["seq"], m["ts"], m["user"], m["text"], m.get("css"), m.get("html"), extra_json(m))
+            for m in self._pending
+        ]
+        with self._conn() as db:
+            db.executemany(
+                "INSERT INTO messages (channel, seq, ts, user, text, css, html, extra) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        self._pending = []
+
+    def flush(self):
+        with self._lock:
+            self._flush_spills()
+
+    # ---------------- API ----------------
+    def append(self, user, text, css=None, ts=None, **extra):
+        message = {"user": user, "text": text, "css": css, "ts": time.time() if ts is None else ts, **extra}
+
+        with self._lock:
+            message["seq"] = self._next_seq
+            self._next_seq += 1
+
+            if len(self.visible) == self.visible.maxlen:
+                self._spill(self.visible[0])
+            if self.render is not None:
+                message["html"] = self.render(message)
+            self.visible.append(message)
+
+        return message
+
+    def update(self, seq, **fields):
+        # change extra fields (e.g. likes) of a message, visible or spilled
+        with self._lock:
+            for message in list(self.visible) + self._pending:
+                if message["seq"] == seq:
+                    message.update(fields)
+                    return message
+
+            if not self.spilled:
+                return None
+            db = self._conn()
+            row = db.execute(SELECT + "WHERE channel = ? AND seq = ?", (self.channel, seq)).fetchone()
+            if row is None:
+                return None
+
+            message = message_row(row)
+            message.update(fields)
+            with db:
+                db.execute("UPDATE messages SET extra = ? WHERE channel = ? AND seq = ?",
+                           (extra_json(message), self.channel, seq))
+            return message
+
+    def html(self):
+        return "".join(m["html"] for m in self.visible)
+
+    def older(self, page=1, page_size=PAGE_SIZE):
+        # page 1 = the newest spilled messages, just above the visible window
+        if not self.spilled:
+            return []
+
+        with self._lock:
+            self._flush_spills()
+            rows = self._conn().execute(
+                SELECT + "WHERE channel = ? ORDER BY ts DESC, seq DESC LIMIT ? OFFSET ?",
+                (self.channel, page_size, (page - 1) * page_size),
+            ).fetchall()
+
+        return [message_row(r) for r in reversed(rows)]
+
+    def pages(self, page_size=PAGE_SIZE):
+        return -(-self.spilled // page_size)
+
+    def by_user(self, user, since=None, until=None, limit=100):
+        with self._lock:
+            self._flush_spills()
+            rows = self._conn().execute(
+                SELECT + "WHERE channel = ? AND user = ? AND ts >= ? AND ts < ? "
+                "ORDER BY ts DESC LIMIT ?",
+                (self.channel, user, since or 0, until or float("inf"), limit),
+            ).fetchall() if self.spilled else []
+
+        found = [message_row(r) for r in reversed(rows)]
+        found += [m for m in self.visible if m["user"] == user
+                  and (since or 0) <= m["ts"] < (until or float("inf"))]
+        return found[-limit:]
+
+    def __len__(self):
+        return self.spilled + len(self.visible)
+
+    def drop(self):
+        # delete this channel's spilled messages (e.g. when its session ends)
+        with self._lock:
+            self._pending = []
+            if self._db is not None or os.path.exists(self.db_path):
+                with self._conn() as db:
+                    db.execute("DELETE FROM messages WHERE channel = ?", (self.channel,))
+            self.spilled = 0
+
+    def close(self):
+        self.flush()
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,211 @@
+import os
+import re
+import string
+from functools import lru_cache
+import emoji
+
+# ---------------- TOOLS ----------------
+# importing nltk drags in most of its dependencies (over a second), so the
+# stop words and lemmatizer are loaded on the first word normalized
+@lru_cache(maxsize=None)
+def nltk_tools():
+    from nltk.corpus import stopwords
+    from nltk.stem import WordNetLemmatizer
+
+    return set(stopwords.words('english')), WordNetLemmatizer()
+
+
+URL_RE = re.compile(r'http\S+|www\S+')
+NON_ALPHA_RE = re.compile(r'[^a-z\s]')
+
+# ---------------- LEMMA CACHE ----------------
+# Chat vocabulary is very Zipfian, so a bounded word -> lemma cache hits
+# almost every token. Stop words map to None so the filter and the
+# lemmatizer share a single lookup.
+LEMMA_CACHE_SIZE = int(os.environ.get("LEMMA_CACHE_SIZE", 50000))
+
+
+@lru_cache(maxsize=LEMMA_CACHE_SIZE)
+def normalize_word(word):
+    stop_words, lemmatizer = nltk_tools()
+    if word in stop_words:
+        return None
+    return lemmatizer.lemmatize(word)
+
+
+def lemma_cache_stats():
+    info = normalize_word.cache_info()
+    lookups = info.hits + info.misses
+
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "size": info.currsize,
+        "maxsize": info.maxsize,
+        "hit_rate": info.hits / lookups if lookups else 0.0,
+    }
+
+
+def clear_lemma_cache():
+    normalize_word.cache_clear()
+
+
+# ---------------- TEXT CLEAN ----------------
+def tokenize(text):
+    text = str(text).lower()
+
+    # remove URLs
+    text = URL_RE.sub('', text)
+
+    # remove emojis
+    text = emoji.replace_emoji(text, replace='')
+
+    # remove punctuation & numbers
+    text = NON_ALPHA_RE.sub('', text)
+
+    # tokenize, remove stopwords & lemmatize
+    return [w for w in map(normalize_word, text.split()) if w is not None]
+
+
+def clean_text(text):
+    return " ".join(tokenize(text))
+
+
+# ---------------- N-GRAMS ----------------
+# The TF-IDF vocabulary is built from word n-grams of the cleaned tokens.
+# TfidfVectorizer's default token_pattern (\b\w\w+\b) on a cleaned string
+# is exactly "split on spaces, drop 1-letter words", so token lists from
+# tokenize() can be turned into n-grams directly, without joining them
+# into a string and re-tokenizing it with a regex.
+TOKEN_PATTERN = r"(?u)\b\w\w+\b"
+MIN_TOKEN_LEN = 2
+
+
+def word_ngrams(tokens, ngram_range=(1, 1)):
+    tokens = [t for t in tokens if len(t) >= MIN_TOKEN_LEN]
+
+    lo, hi = ngram_range
+    grams = list(tokens) if lo == 1 else []
+    for n in range(max(lo, 2), hi + 1):
+        grams += [" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1)]
+
+    return grams
+
+
+# ---------------- OBFUSCATION ----------------
+# Opt-in normalizer for evasions like "b!tch", "k 1 l l" and "stuuupid"
+# (ModerationEngine.enable_obfuscation_normalizer, MODERATION_OBFUSCATION=1).
+# One str.translate pass maps whitespace to spaces and drops punctuation
+# except leetspeak symbols, and one ASCII encode drops emoji and other
+# non-ASCII characters, instead of the regex + emoji chain above. Each
+# distinct token is then de-obfuscated once and cached. Every rewrite must
+# produce a word of the lexicon (the vectorizer's unigrams): leet symbols
+# between letters of a mostly-letter word ("sh1t", not "1st" or "mp3"),
+# elongations and spaced-out letters. Anything else, and everything when
+# there is no lexicon, cleans exactly as in clean_text.
+LEET = {'0': 'o', '1': 'i', '3': 'e', '4': 'a', '5': 's', '7': 't', '@': 'a', '$': 's', '!': 'i', '|': 'i'}
+LEET_TABLE = str.maketrans(LEET)
+LEET_RUN_RE = re.compile(r'(?<=[a-z])[' + re.escape(''.join(LEET)) + r']+(?=[a-z])')
+NON_LETTERS = str.maketrans('', '', string.digits + ''.join(LEET))
+# no-break, en/em and ideographic spaces; zero-width ones are dropped instead
+UNICODE_SPACES = '\u00a0\u1680\u2000\u2001\u2002\u2003\u2004\u2005\u2006\u2007\u2008\u2009\u200a\u202f\u205f\u3000'
+
+
+def obfuscation_table():
+    table = {ord(c): ' ' for c in UNICODE_SPACES}
+    for c in map(chr, range(128)):
+        if c.isspace():
+            table[ord(c)] = ' '
+        elif not (c in string.ascii_lowercase or c in string.digits or c in LEET):
+            table[ord(c)] = None
+    return table
+
+
+OBFUSCATION_TABLE = obfuscation_table()
+# the '@' of an e-mail address is not an "a"
+EMAIL_AT_RE = re.compile(r'(?<=\w)@(?=[\w-]+\.)')
+ELONGATED_RE = re.compile(r'([a-z])\1{2,}')
+# shortest run of single letters taken for a spaced-out word ("k i l l")
+SPACED_MIN = 3
+
+
+class ObfuscationNormalizer:
+
+    def __init__(self, lexicon=None, cache_size=LEMMA_CACHE_SIZE):
+        self.lexicon = frozenset(lexicon) if lexicon is not None else None
+        self.word = lru_cache(maxsize=cache_size)(self._word)
+
+    def known(self, word):
+        if self.lexicon is None:
+            return False
+        lemma = normalize_word(word)
+        return lemma is not None and (word in self.lexicon or lemma in self.lexicon)
+
+    def collapse(self, word):
+        # "stuuupid" -> "stuupid" or "stupid", whichever is known
+        if ELONGATED_RE.search(word) is None:
+            return word
+        for candidate in (ELONGATED_RE.sub(r'\1\1', word), ELONGATED_RE.sub(r'\1', word)):
+            if self.known(candidate):
+                return candidate
+        return word
+
+    def _word(self, token):
+        # the '@' of a mention is dropped, as by clean_text ('#' already is)
+        core = token.lstrip('@')
+        letters = core.translate(NON_LETTERS)
+        if letters == core:
+            return self.collapse(core)
+
+        if len(core) == 1:
+            # kept for now: may be a spaced-out letter ("k 1 l l")
+            return core
+        if 2 * len(letters) >= len(core):
+            word = self.collapse(LEET_RUN_RE.sub(lambda m: m.group().translate(LEET_TABLE), core).translate(NON_LETTERS))
+            if self.known(word):
+                return word
+        return self.collapse(letters)
+
+    def rejoin(self, run):
+        # longest known suffix: the letters before it are often real
+        # one-letter words ("u r a l o s e r")
+        for start in range(len(run) - SPACED_MIN + 1):
+            word = self.collapse("".join(run[start:]).translate(LEET_TABLE))
+            if self.known(word):
+                return run[:start] + [word]
+        return run
+
+    def join_spaced(self, words):
+        out, run = [], []
+        for w in words + [""]:
+            if len(w) == 1:
+                run.append(w)
+                continue
+            out += self.rejoin(run) if len(run) >= SPACED_MIN else run
+            run = []
+            if w:
+                out.append(w)
+        return out
+
+    def words(self, text):
+        # everything before stop-word removal and lemmatization
+        text = str(text).lower()
+        if 'http' in text or 'www' in text:
+            text = URL_RE.sub('', text)
+        if '@' in text:
+            text = EMAIL_AT_RE.sub('', text)
+
+        text = text.translate(OBFUSCATION_TABLE).encode('ascii', 'ignore').decode('ascii')
+
+        words = [w for w in map(self.word, text.split()) if w]
+        if self.lexicon is not None and any(len(w) == 1 for w in words):
+            words = self.join_spaced(words)
+
+        # lone digits and symbols not taken into a spaced-out word are dropped
+        return [w for w in words if w.isalpha()]
+
+    def tokenize(self, text):
+        return [w for w in map(normalize_word, self.words(text)) if w is not None]
+
+    def clean_text(self, text):
+        return " ".join(self.tokenize(text))
@@ -0,0 +1,177 @@
+# Compact training artifacts and int8 linear weights.
+#
+#   python compact.py            # report only
+#   python compact.py --write    # overwrite X_features.pkl / y_labels.pkl
+#
+# X_features.pkl is a float64 CSR matrix and y_labels.pkl a Series of
+# label strings. The compact forms are float32 data with int32 indices,
+# and a categorical Series (int8 codes + the class names), which sklearn
+# and the rest of the pipeline accept unchanged. Linear weights can also
+# be stored as int8 with one float scale per class row (see
+# export_fast_model(quantize=True)). The report shows memory and disk
+# saved, load-time speedup and the accuracy impact on the held-out split;
+# for int8 weights also how many serving verdicts (safe/warn/block on the
+# probability) change and the largest probability drift, since serving
+# decides on probabilities against the cutoffs, not on the argmax.
+import argparse
+import json
+import os
+import tempfile
+import time
+import joblib
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score
+from fast_model import _probability_kind, MappedLinearModel, MappedLogisticModel
+from moderation import ml_scores, verdict_for
+
+REPORT_PATH = "models/compact_report.json"
+
+
+# ---------------- CONVERT ----------------
+def compact_features(X):
+    X = sp.csr_matrix(X, dtype=np.float32)
+    X.indices = X.indices.astype(np.int32)
+    X.indptr = X.indptr.astype(np.int32 if X.nnz < 2**31 else np.int64)
+    return X
+
+
+def compact_labels(y):
+    # categorical codes are int8 for up to 127 classes
+    return pd.Series(pd.Categorical(y), name=getattr(y, "name", None))
+
+
+def quantize_weights(coef):
+    # symmetric int8 with one scale per class row: w[k] ~= q[k] * scale[k]
+    coef = np.asarray(coef, dtype=np.float64)
+    scale = np.abs(coef).max(axis=1) / 127
+    scale[scale == 0] = 1.0
+    q = np.clip(np.rint(coef / scale[:, None]), -127, 127).astype(np.int8)
+    return q, scale
+
+
+# ---------------- MEASURE ----------------
+def matrix_bytes(X):
+    return X.data.nbytes + X.indices.nbytes + X.indptr.nbytes
+
+
+def label_bytes(y):
+    return int(pd.Series(y).memory_usage(deep=True, index=False))
+
+
+def load_seconds(obj, repeat=3):
+    # dump to a temp file and time the fastest of a few loads
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "artifact.pkl")
+        joblib.dump(obj, path)
+        size = os.path.getsize(path)
+
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            joblib.load(path)
+            best = min(best, time.perf_counter() - start)
+
+    return best, size
+
+
+def quantized_model(model):
+    # the model export_fast_model(quantize=True) would serve
+    q, scale = quantize_weights(model.coef_)
+    intercept = np.asarray(model.intercept_, dtype=np.float64).ravel()
+    kind = _probability_kind(model)
+    if kind == "decision":
+        return MappedLinearModel(q, intercept, model.classes_, scale)
+    return MappedLogisticModel(q, intercept, model.classes_, kind, scale)
+
+
+def quantization_report(model, quantized, X, y=None):
+    # argmax and serving-verdict agreement, and probability drift
+    full, small = ml_scores(model, X), ml_scores(quantized, X)
+    report = {
+        "argmax_agreement": float(np.mean(model.predict(X) == quantized.predict(X))),
+        "verdict_agreement": float(np.mean([verdict_for(a) == verdict_for(b) for a, b in zip(full, small)])),
+        "max_score_drift": float(np.abs(full - small).max()),
+    }
+    if hasattr(model, "predict_proba"):
+        report["max_prob_drift"] = float(np.abs(model.predict_proba(X) - quantized.predict_proba(X)).max())
+    if y is not None:
+        report["accuracy"] = float(accuracy_score(y, quantized.predict(X)))
+    return report
+
+
+def print_quantization(report):
+    print(f"  int8 weights: argmax agreement {report['argmax_agreement']:.2%}, "
+          f"verdict agreement {report['verdict_agreement']:.2%}, "
+          f"max score drift {report['max_score_drift']:.4f}, "
+          f"max probability drift {report.get('max_prob_drift', float('nan')):.4f}")
+
+
+if __name__ == "__main__":
+    from train_models import split_indices, SPLIT_PATH
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--write", action="store_true", help="overwrite the feature and label pickles")
+    parser.add_argument("--report", default=REPORT_PATH)
+    args = parser.parse_args()
+
+    print("\n🔄 Loading features...")
+
+    X = joblib.load("models/X_features.pkl")
+    y = joblib.load("models/y_labels.pkl")
+
+    X32 = compact_features(X)
+    y8 = compact_labels(y)
+
+    # ---------------- MEMORY / LOAD TIME ----------------
+    rows = {}
+    for name, full, small, size_of in [
+        ("features", X, X32, matrix_bytes),
+        ("labels", y, y8, label_bytes),
+    ]:
+        full_s, full_disk = load_seconds(full)
+        small_s, small_disk = load_seconds(small)
+        rows[name] = {
+            "memory_bytes": [size_of(full), size_of(small)],
+            "disk_bytes": [full_disk, small_disk],
+            "load_seconds": [full_s, small_s],
+        }
+
+    print(f"\n{'':>9} {'memory MB':>19} {'disk MB':>19} {'load ms':>17}")
+    for name, r in rows.items():
+        (m0, m1), (d0, d1), (l0, l1) = r["memory_bytes"], r["disk_bytes"], r["load_seconds"]
+        print(f"{name:>9} {m0/1e6:>8.2f} → {m1/1e6:>7.2f} {d0/1e6:>8.2f} → {d1/1e6:>7.2f} "
+              f"{l0*1e3:>7.1f} → {l1*1e3:>6.1f} ({l0 / max(l1, 1e-9):.1f}x)")
+
+    # ---------------- ACCURACY ----------------
+    if os.path.exists(SPLIT_PATH):
+        split = np.load(SPLIT_PATH)
+        train_idx, test_idx = split["train"], split["test"]
+    else:
+        train_idx, test_idx = split_indices(y)
+    y_arr = np.asarray(y)
+
+    accuracy = {}
+    for name, features in [("float64", X), ("float32", X32)]:
+        model = LogisticRegression(max_iter=2000, class_weight='balanced')
+        model.fit(features[train_idx], y_arr[train_idx])
+        accuracy[name] = accuracy_score(y_arr[test_idx], model.predict(features[test_idx]))
+
+    quantization = quantization_report(model, quantized_model(model), X32[test_idx], y_arr[test_idx])
+    accuracy["float32 + int8 weights"] = quantization["accuracy"]
+
+    print("\nHeld-out accuracy (Logistic Regression):")
+    for name, acc in accuracy.items():
+        print(f"  {name:<24} {acc:.4f}")
+    print_quantization(quantization)
+
+    with open(args.report, "w") as f:
+        json.dump({"artifacts": rows, "accuracy": accuracy, "quantization": quantization}, f, indent=2)
+    print(f"\n✅ Report saved to {args.report}")
+
+    if args.write:
+        joblib.dump(X32, "models/X_features.pkl")
+        joblib.dump(y8, "models/y_labels.pkl")
+        print("✅ Wrote float32 features and int8-coded labels — run train_models.py next")
@@ -1,20 +1,180 @@
+# Held-out evaluation and safe/warn/block cutoff sweep.
+#
+#   python evaluate_model.py                       # confusion matrix
+#   python evaluate_model.py --sweep               # curves + recommended cutoffs
+#
+# Only the test rows saved by train_models.py (models/split_indices.npz)
+# are scored, in one vectorized pass. --sweep computes the serving score
+# (ML score + VADER aggression boost) for every test comment, derives
+# precision / recall / block-rate at every threshold from one sort, and
+# writes the recommended cutoffs to models/serving_thresholds.json, which
+# moderation.py reads at startup.
+import argparse
+import json
+import os
 import joblib
-from sklearn.metrics import confusion_matrix, ConfusionMatrixDisplay
-import matplotlib.pyplot as plt
+import numpy as np
+from sklearn.metrics import accuracy_score, confusion_matrix, ConfusionMatrixDisplay
+from moderation import ml_scores, aggression_boost, load_sentiment, SAFE_MAX, WARN_MAX, THRESHOLDS_PATH, MODEL_PATH, SAFE_LABEL
+from train_models import SPLIT_PATH, split_indices
 
-# load test data and model
-model = joblib.load("models/Logistic_Regression.pkl")
-X = joblib.load("models/X_features.pkl")
-y = joblib.load("models/y_labels.pkl")
+CURVE_PATH = "models/threshold_curve.csv"
 
-# predictions
-pred = model.predict(X)
+# block: highest recall whose precision is still >= BLOCK_PRECISION
+# safe: highest cutoff that still flags >= FLAG_RECALL of harmful comments
+BLOCK_PRECISION = 0.9
+FLAG_RECALL = 0.95
 
-# confusion matrix
-cm = confusion_matrix(y, pred)
 
-# display
-disp = ConfusionMatrixDisplay(confusion_matrix=cm, display_labels=["Normal", "Bullying"])
-disp.plot(cmap="Blues")
-plt.title("Confusion Matrix")
-plt.show()
\ No newline at end of file
+# ---------------- DATA ----------------
+def load_test_rows(n_rows, y):
+    if os.path.exists(SPLIT_PATH):
+        test_idx = np.load(SPLIT_PATH)["test"]
+        if len(test_idx) and test_idx.max() < n_rows:
+            return test_idx
+        print(f"⚠️ {SPLIT_PATH} does not match the feature matrix, re-deriving the split")
+    else:
+        print(f"⚠️ {SPLIT_PATH} not found (run train_models.py), re-deriving the split")
+
+    return split_indices(y)[1]
+
+
+def serving_scores(model, X_test, test_idx, sentiment):
+    boost = None
+    if sentiment:
+        # the boost is computed on the cleaned text, like ModerationEngine
+        from features import load_text_and_labels
+
+        texts, _ = load_text_and_labels(verbose=False)
+        analyzer = load_sentiment()
+        boost = np.array([aggression_boost(analyzer.polarity_scores(t)["compound"]) for t in texts.iloc[test_idx]])
+
+    scores = ml_scores(model, X_test, boost)
+    if boost is not None:
+        scores = scores + boost
+
+    return np.clip(scores, 0, 1)
+
+
+# ---------------- SWEEP ----------------
+def threshold_curve(scores, harmful):
+    # sort once; every threshold is then a prefix of the sorted scores
+    order = np.argsort(-scores, kind="stable")
+    sorted_scores = scores[order]
+    tp = np.cumsum(harmful[order])
+
+    thresholds = np.unique(sorted_scores)[::-1]
+    # number of comments with score >= t
+    flagged = np.searchsorted(-sorted_scores, -thresholds, side="right")
+    hits = tp[flagged - 1]
+
+    return {
+        "threshold": thresholds,
+        "precision": hits / flagged,
+        "recall": hits / max(harmful.sum(), 1),
+        "flag_rate": flagged / len(scores),
+    }
+
+
+def at_cutoff(scores, harmful, cutoff, strict=False):
+    flagged = scores > cutoff if strict else scores >= cutoff
+    hits = (flagged & harmful).sum()
+
+    return {
+        "cutoff": float(cutoff),
+        "precision": float(hits / flagged.sum()) if flagged.any() else None,
+        "recall": float(hits / max(harmful.sum(), 1)),
+        "rate": float(flagged.mean()),
+    }
+
+
+def recommend(curve, block_precision, flag_recall):
+    precise = np.flatnonzero(curve["precision"] >= block_precision)
+    # thresholds are descending, so the last qualifying one has the most recall
+    warn_max = curve["threshold"][precise[-1]] if len(precise) else curve["threshold"][0]
+
+    covering = np.flatnonzero(curve["recall"] >= flag_recall)
+    # anything strictly above safe_max is at least a warning
+    safe_index = covering[0] if len(covering) else len(curve["threshold"]) - 1
+    below = curve["threshold"][safe_index + 1:]
+    safe_max = below[0] if len(below) else 0.0
+
+    return float(min(safe_max, warn_max)), float(warn_max)
+
+
+def write_curve(curve, path):
+    with open(path, "w") as f:
+        f.write("threshold,precision,recall,flag_rate\n")
+        for row in zip(*(curve[k] for k in ("threshold", "precision", "recall", "flag_rate"))):
+            f.write(",".join(f"{v:.6g}" for v in row) + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default=MODEL_PATH, help="the model the cutoffs will gate")
+    parser.add_argument("--sweep", action="store_true", help="sweep serving-score cutoffs instead of plotting")
+    parser.add_argument("--safe-label", default=SAFE_LABEL, help="label of non-harmful comments")
+    parser.add_argument("--block-precision", type=float, default=BLOCK_PRECISION)
+    parser.add_argument("--flag-recall", type=float, default=FLAG_RECALL)
+    parser.add_argument("--no-sentiment", action="store_true", help="score without the VADER aggression boost")
+    parser.add_argument("--output", default=THRESHOLDS_PATH)
+    args = parser.parse_args()
+
+    # load model and the held-out rows only
+    model = joblib.load(args.model)
+    X = joblib.load("models/X_features.pkl")
+    y = joblib.load("models/y_labels.pkl")
+
+    test_idx = load_test_rows(X.shape[0], y)
+    X_test = X[test_idx]
+    y_test = np.asarray(y)[test_idx]
+
+    print(f"Scoring {len(test_idx)} held-out rows of {X.shape[0]}")
+
+    if not args.sweep:
+        pred = model.predict(X_test)
+        print(f"Accuracy: {accuracy_score(y_test, pred):.4f}")
+
+        import matplotlib.pyplot as plt
+
+        cm = confusion_matrix(y_test, pred, labels=model.classes_)
+        disp = ConfusionMatrixDisplay(confusion_matrix=cm, display_labels=model.classes_)
+        disp.plot(cmap="Blues", xticks_rotation=45)
+        plt.title("Confusion Matrix (held-out)")
+        plt.tight_layout()
+        plt.show()
+
+    else:
+        scores = serving_scores(model, X_test, test_idx, sentiment=not args.no_sentiment)
+        harmful = np.asarray(y_test).astype(str) != str(args.safe_label)
+
+        curve = threshold_curve(scores, harmful)
+        write_curve(curve, CURVE_PATH)
+
+        safe_max, warn_max = recommend(curve, args.block_precision, args.flag_recall)
+
+        print(f"\n{'':>12} {'cutoff':>8} {'precision':>10} {'recall':>8} {'rate':>8}")
+        summary = {}
+        for name, (safe, warn) in {"current": (SAFE_MAX, WARN_MAX), "recommended": (safe_max, warn_max)}.items():
+            summary[name] = {
+                "flag": at_cutoff(scores, harmful, safe, strict=True),
+                "block": at_cutoff(scores, harmful, warn),
+            }
+            for kind, row in summary[name].items():
+                precision = f"{row['precision']:.3f}" if row["precision"] is not None else "-"
+                print(f"{name + ' ' + kind:>20} {row['cutoff']:>8.4f} {precision:>10} {row['recall']:>8.3f} {row['rate']:>8.3f}")
+
+        with open(args.output + ".tmp", "w") as f:
+            json.dump({
+                "safe_max": safe_max,
+                "warn_max": warn_max,
+                "model": args.model,
+                "test_rows": len(test_idx),
+                "sentiment": not args.no_sentiment,
+                "targets": {"block_precision": args.block_precision, "flag_recall": args.flag_recall},
+                "evaluation": summary,
+            }, f, indent=2)
+        os.replace(args.output + ".tmp", args.output)
+
+        print(f"\n✅ Curve saved to {CURVE_PATH}")
+        print(f"✅ Recommended cutoffs safe <= {safe_max:.4f}, block >= {warn_max:.4f} saved to {args.output}")
@@ -0,0 +1,166 @@
+# Recall on obfuscated abuse, with and without the obfuscation normalizer.
+#
+#   python evaluate_obfuscation.py --rate 0.5 --output models/obfuscation_report.json
+#
+# Held-out comments (models/split_indices.npz) are rewritten with the
+# evasions people use against keyword filters: leetspeak ("b1tch"),
+# symbols inside words ("b!tch"), elongations ("stuuupid"), spaced-out
+# letters ("k i l l") and emoji between letters. Each comment is scored by
+# the serving engine as written and obfuscated, with the default cleaning
+# and with cleaning.ObfuscationNormalizer. Reports recall (harmful flagged
+# above SAFE_MAX / blocked at WARN_MAX) and the flag rate on safe comments,
+# so a recall gain that only comes from flagging everything shows up.
+#
+# First, as a regression check, raw comments from the dataset are cleaned
+# by clean_text and by the normalizer without a lexicon, which must give
+# the same tokens (exit status 1 otherwise). The lexicon rewrites
+# (elongations, spaced-out words) are counted but intended.
+import argparse
+import json
+import os
+import random
+import sys
+import numpy as np
+import pandas as pd
+from cleaning import ObfuscationNormalizer, tokenize
+from moderation import ModerationEngine, MODEL_PATH, VECTORIZER_PATH, SAFE_MAX, WARN_MAX, vectorizer_words
+from evaluate_model import SAFE_LABEL, load_test_rows
+
+LEET_SWAPS = {'a': '4@', 'e': '3', 'i': '1!', 'o': '0', 's': '5$', 't': '7'}
+
+
+# ---------------- OBFUSCATE ----------------
+def leet(word, rng):
+    return "".join(rng.choice(LEET_SWAPS[c]) if c in LEET_SWAPS and rng.random() < 0.5 else c for c in word)
+
+
+def elongate(word, rng):
+    vowels = [i for i, c in enumerate(word) if c in "aeiouy"]
+    if not vowels:
+        return word
+    i = rng.choice(vowels)
+    return word[:i] + word[i] * rng.randint(3, 6) + word[i + 1:]
+
+
+def space_out(word, rng):
+    return " ".join(word)
+
+
+def emoji_inside(word, rng):
+    i = rng.randint(1, len(word) - 1)
+    return word[:i] + rng.choice("🤬💀🔪😡") + word[i:]
+
+
+TRICKS = [leet, elongate, space_out, emoji_inside]
+
+
+def obfuscate(text, rate=0.5, seed=42):
+    # rewrite each word of 4+ letters with probability `rate`
+    rng = random.Random(f"{seed}:{text}")
+    words = str(text).split()
+    return " ".join(
+        rng.choice(TRICKS)(w, rng) if len(w) >= 4 and w.isalpha() and rng.random() < rate else w
+        for w in words
+    )
+
+
+# ---------------- PARITY ----------------
+def parity(texts, normalizer):
+    # comments the normalizer cleans differently from clean_text
+    mismatches = []
+    for text in texts:
+        expected, found = tokenize(text), normalizer.tokenize(text)
+        if expected != found:
+            mismatches.append({"text": text, "clean_text": expected, "normalizer": found})
+    return mismatches
+
+
+# ---------------- SCORE ----------------
+def rates(scores, harmful):
+    flagged = scores > SAFE_MAX
+    return {
+        "recall_flag": float(flagged[harmful].mean()) if harmful.any() else None,
+        "recall_block": float((scores[harmful] >= WARN_MAX).mean()) if harmful.any() else None,
+        "safe_flag_rate": float(flagged[~harmful].mean()) if (~harmful).any() else None,
+    }
+
+
+def evaluate(engine, texts, harmful, rate=0.5, seed=42):
+    obfuscated = [obfuscate(t, rate, seed) for t in texts]
+    normalizer = engine.normalizer
+    results = {}
+
+    for name, enabled in [("default", False), ("normalizer", True)]:
+        if enabled:
+            engine.enable_obfuscation_normalizer()
+        else:
+            engine.normalizer = None
+
+        for variant, batch in [("original", texts), ("obfuscated", obfuscated)]:
+            scores = np.array([v.score for v in engine.score_batch(batch)])
+            results[f"{variant} / {name}"] = rates(scores, harmful)
+
+    engine.normalizer = normalizer
+    return results
+
+
+if __name__ == "__main__":
+    from features import load_text_and_labels
+    from preprocess import RAW_PATH
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--vectorizer", default=VECTORIZER_PATH)
+    parser.add_argument("--rate", type=float, default=0.5, help="share of words rewritten")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--safe-label", default=SAFE_LABEL)
+    parser.add_argument("--raw", default=RAW_PATH, help="raw comments for the parity check")
+    parser.add_argument("--parity-rows", type=int, default=5000)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    # cleaned text is lowercase words, so every trick applies to real words
+    texts, labels = load_text_and_labels(verbose=False)
+    test_idx = load_test_rows(len(texts), labels)
+    texts = texts.iloc[test_idx].astype(str).tolist()
+    harmful = np.asarray(labels)[test_idx].astype(str) != str(args.safe_label)
+
+    engine = ModerationEngine.load(args.model, args.vectorizer)
+
+    # ---------------- PARITY CHECK ----------------
+    mismatches, rewritten = [], []
+    if os.path.exists(args.raw):
+        raw = pd.read_csv(args.raw, nrows=args.parity_rows).iloc[:,0].fillna("").astype(str).tolist()
+        mismatches = parity(raw, ObfuscationNormalizer())
+        rewritten = parity(raw, ObfuscationNormalizer(vectorizer_words(engine.vectorizer)))
+
+        print(f"Parity on {len(raw)} raw comments: {len(mismatches)} differ from clean_text, "
+              f"{len(rewritten)} rewritten with the lexicon")
+        for row in mismatches[:5]:
+            print(f"  ❌ {row['text']!r}: {row['clean_text']} != {row['normalizer']}")
+    else:
+        print(f"⚠️ {args.raw} not found, skipping the parity check")
+
+    print(f"Scoring {len(texts)} held-out comments ({harmful.sum()} harmful), {args.rate:.0%} of words obfuscated")
+
+    results = evaluate(engine, texts, harmful, args.rate, args.seed)
+
+    print(f"\n{'':>24} {'flag recall':>12} {'block recall':>13} {'safe flagged':>13}")
+    for name, r in results.items():
+        print(f"{name:>24} {r['recall_flag']:>12.3f} {r['recall_block']:>13.3f} {r['safe_flag_rate']:>13.3f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "model": args.model,
+                "test_rows": len(texts),
+                "rate": args.rate,
+                "seed": args.seed,
+                "cutoffs": {"safe_max": SAFE_MAX, "warn_max": WARN_MAX},
+                "results": results,
+                "parity": {"mismatches": mismatches, "lexicon_rewrites": len(rewritten)},
+            }, f, indent=2)
+        print(f"✅ Report written to {args.output}")
+
+    if mismatches:
+        sys.exit(1)
@@ -0,0 +1,297 @@
+# Flat, memory-mappable model artifact for linear models.
+#
+# export_fast_model() writes the TF-IDF vocabulary, idf vector, linear
+# weights and intercepts as plain .npy files plus a small meta.json.
+# load_fast_model() maps them read-only, so cold start is a few
+# milliseconds and every worker process shares the same physical pages
+# through the OS page cache.
+#
+# export_vectorizer() / load_vectorizer() do the same for the TF-IDF
+# vectorizer alone: a sorted byte-string term array searched with
+# np.searchsorted replaces the pickled vocabulary dict.
+import json
+import os
+import re
+import numpy as np
+import scipy.sparse as sp
+from cleaning import word_ngrams, TOKEN_PATTERN
+
+FAST_MODEL_DIR = "models/fast_model"
+SLIM_VECTORIZER_DIR = "models/tfidf_vectorizer"
+
+VECTORIZER_ARRAYS = ["vocab_terms", "vocab_index", "idf"]
+ARRAYS = VECTORIZER_ARRAYS + ["coef", "intercept"]
+
+
+# ---------------- EXPORT ----------------
+def _check_vectorizer(vectorizer):
+    unsupported = {
+        "analyzer": vectorizer.analyzer != "word",
+        "tokenizer": vectorizer.tokenizer is not None,
+        "preprocessor": vectorizer.preprocessor is not None,
+        "stop_words": vectorizer.stop_words is not None,
+        "strip_accents": vectorizer.strip_accents is not None,
+        "binary": vectorizer.binary,
+        "norm": vectorizer.norm not in ("l2", None),
+        "use_idf": not vectorizer.use_idf,
+    }
+    bad = [name for name, flag in unsupported.items() if flag]
+    if bad:
+        raise ValueError(f"vectorizer settings not supported by the fast format: {', '.join(bad)}")
+
+
+def _probability_kind(model):
+    if not hasattr(model, "coef_"):
+        raise ValueError(f"{type(model).__name__} is not a linear model")
+
+    if not hasattr(model, "predict_proba"):
+        return "decision"
+    if len(model.classes_) == 2:
+        return "sigmoid"
+    if getattr(model, "multi_class", "auto") == "ovr" or getattr(model, "solver", None) == "liblinear":
+        return "ovr"
+    return "softmax"
+
+
+def _save_array(path, array):
+    # write to a new file and rename it into place, so processes that
+    # still map the previous version keep a valid inode
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp, path)
+
+
+def _save_json(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+def vocabulary_arrays(vocabulary):
+    terms = sorted(vocabulary)
+    encoded = np.array([t.encode("utf-8") for t in terms])
+    index = np.array([vocabulary[t] for t in terms], dtype=np.int32)
+    return encoded, index
+
+
+def vectorizer_arrays(vectorizer):
+    terms, index = vocabulary_arrays(vectorizer.vocabulary_)
+    return {
+        "vocab_terms": terms,
+        "vocab_index": index,
+        "idf": np.asarray(vectorizer.idf_, dtype=np.float64),
+    }
+
+
+def vectorizer_meta(vectorizer):
+    return {
+        "ngram_range": list(vectorizer.ngram_range),
+        "token_pattern": vectorizer.token_pattern,
+        "lowercase": vectorizer.lowercase,
+        "norm": vectorizer.norm,
+        "sublinear_tf": vectorizer.sublinear_tf,
+    }
+
+
+def export_vectorizer(vectorizer, path=SLIM_VECTORIZER_DIR):
+    _check_vectorizer(vectorizer)
+    os.makedirs(path, exist_ok=True)
+
+    for name, array in vectorizer_arrays(vectorizer).items():
+        _save_array(os.path.join(path, f"{name}.npy"), array)
+    # written last: its mtime marks the export as complete
+    _save_json(os.path.join(path, "vectorizer.json"), vectorizer_meta(vectorizer))
+
+    return path
+
+
+def export_fast_model(model, vectorizer, path=FAST_MODEL_DIR, quantize=False, source=None):
+    # `source`: the pickle of `model`, so serving only maps a current export
+    _check_vectorizer(vectorizer)
+    kind = _probability_kind(model)
+
+    coef, coef_scale = np.ascontiguousarray(model.coef_, dtype=np.float64), None
+    if quantize:
+        # int8 weights with one float scale per class row (see compact.py)
+        from compact import quantize_weights
+        coef, coef_scale = quantize_weights(coef)
+
+    os.makedirs(path, exist_ok=True)
+
+    arrays = {
+        **vectorizer_arrays(vectorizer),
+        "coef": coef,
+        "intercept": np.asarray(model.intercept_, dtype=np.float64).ravel(),
+    }
+    for name, array in arrays.items():
+        _save_array(os.path.join(path, f"{name}.npy"), array)
+
+    _save_json(os.path.join(path, "meta.json"), {
+        "model": type(model).__name__,
+        "source": source,
+        "kind": kind,
+        "classes": np.asarray(model.classes_).tolist(),
+        **vectorizer_meta(vectorizer),
+        "coef_scale": None if coef_scale is None else np.asarray(coef_scale).tolist(),
+    })
+
+    return path
+
+
+# ---------------- VECTORIZER ----------------
+class MappedVectorizer:
+    # Reproduces TfidfVectorizer.transform for the plain word analyzer:
+    # lowercase -> token_pattern -> n-grams -> counts (1 + log(count) with
+    # sublinear_tf) * idf -> l2 norm.
+
+    def __init__(self, terms, index, idf, ngram_range, token_pattern, lowercase=True, norm="l2",
+                 sublinear_tf=False):
+        self.terms = terms
+        self.index = index
+        self.idf = idf
+        self.ngram_range = tuple(ngram_range)
+        self.token_re = re.compile(token_pattern)
+        self.lowercase = lowercase
+        self.norm = norm
+        self.sublinear_tf = sublinear_tf
+        self.max_term_bytes = terms.dtype.itemsize
+
+    @property
+    def accepts_tokens(self):
+        # token lists from cleaning.tokenize() match the default pattern
+        return self.token_re.pattern == TOKEN_PATTERN
+
+    def ngrams(self, text):
+        if isinstance(text, str):
+            text = self.token_re.findall(text.lower() if self.lowercase else text)
+        return word_ngrams(text, self.ngram_range)
+
+    def lookup(self, grams):
+        # vectorized binary search of encoded n-grams in the sorted term array;
+        # returns the column of each gram, or -1 if it is not in the vocabulary
+        cols = np.full(len(grams), -1, dtype=np.int64)
+        encoded = [g.encode("utf-8") for g in grams]
+        fits = np.array([len(g) <= self.max_term_bytes for g in encoded], dtype=bool)
+
+        if fits.any() and len(self.terms):
+            keys = np.array([g for g, ok in zip(encoded, fits) if ok], dtype=self.terms.dtype)
+            pos = np.minimum(np.searchsorted(self.terms, keys), len(self.terms) - 1)
+            hit = self.terms[pos] == keys
+            cols[np.flatnonzero(fits)] = np.where(hit, self.index[pos], -1)
+
+        return cols
+
+    def transform(self, texts):
+        rows, grams = [], []
+        for i, text in enumerate(texts):
+            g = self.ngrams(text)
+            grams += g
+            rows += [i] * len(g)
+
+        cols = self.lookup(grams)
+        found = cols >= 0
+        rows = np.asarray(rows, dtype=np.int64)[found]
+        n_rows, n_features = len(texts), len(self.idf)
+
+        # count each (row, column) pair; np.unique also sorts them into CSR order
+        keys, counts = np.unique(rows * n_features + cols[found], return_counts=True)
+        rows, cols = np.divmod(keys, n_features)
+        if self.sublinear_tf:
+            counts = 1 + np.log(counts)
+        data = counts * self.idf[cols]
+
+        if self.norm == "l2":
+            norms = np.sqrt(np.bincount(rows, weights=data * data, minlength=n_rows))
+            norms[norms == 0] = 1
+            data = data / norms[rows]
+
+        indptr = np.zeros(n_rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n_rows), out=indptr[1:])
+
+        return sp.csr_matrix((data, cols, indptr), shape=(n_rows, n_features))
+
+
+# ---------------- MODEL ----------------
+class MappedLinearModel:
+
+    def __init__(self, coef, intercept, classes, coef_scale=None):
+        self.coef = coef
+        self.intercept = intercept
+        self.classes_ = np.asarray(classes)
+        self.coef_scale = coef_scale
+
+    def decision_function(self, X):
+        if self.coef_scale is None:
+            scores = np.asarray(X @ self.coef.T) + self.intercept
+        else:
+            # int8 weights: one float multiply per class after the sparse product
+            scores = np.asarray(X @ self.coef.T.astype(np.float32)) * self.coef_scale + self.intercept
+        return scores.ravel() if scores.shape[1] == 1 else scores
+
+    def predict(self, X):
+        scores = self.decision_function(X)
+        if scores.ndim == 1:
+            return self.classes_[(scores > 0).astype(int)]
+        return self.classes_[scores.argmax(axis=1)]
+
+
+class MappedLogisticModel(MappedLinearModel):
+
+    def __init__(self, coef, intercept, classes, kind="softmax", coef_scale=None):
+        super().__init__(coef, intercept, classes, coef_scale)
+        self.kind = kind
+
+    def predict_proba(self, X):
+        scores = self.decision_function(X)
+
+        if self.kind == "sigmoid":
+            p = 1 / (1 + np.exp(-scores))
+            return np.column_stack([1 - p, p])
+
+        if self.kind == "ovr":
+            p = 1 / (1 + np.exp(-scores))
+            return p / p.sum(axis=1, keepdims=True)
+
+        scores = scores - scores.max(axis=1, keepdims=True)
+        p = np.exp(scores)
+        return p / p.sum(axis=1, keepdims=True)
+
+
+# ---------------- LOAD ----------------
+def _load_arrays(path, names):
+    return {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in names}
+
+
+def _mapped_vectorizer(a, meta):
+    return MappedVectorizer(
+        a["vocab_terms"], a["vocab_index"], a["idf"],
+        meta["ngram_range"], meta["token_pattern"], meta["lowercase"], meta["norm"],
+        meta.get("sublinear_tf", False),
+    )
+
+
+def load_vectorizer(path=SLIM_VECTORIZER_DIR):
+    with open(os.path.join(path, "vectorizer.json")) as f:
+        meta = json.load(f)
+    return _mapped_vectorizer(_load_arrays(path, VECTORIZER_ARRAYS), meta)
+
+
+def load_fast_model(path=FAST_MODEL_DIR):
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+
+    a = _load_arrays(path, ARRAYS)
+    vectorizer = _mapped_vectorizer(a, meta)
+
+    # one scale per class row (a single number in older exports)
+    scale = meta.get("coef_scale")
+    if scale is not None:
+        scale = np.asarray(scale, dtype=np.float64)
+    if meta["kind"] == "decision":
+        model = MappedLinearModel(a["coef"], a["intercept"], meta["classes"], scale)
+    else:
+        model = MappedLogisticModel(a["coef"], a["intercept"], meta["classes"], meta["kind"], scale)
+
+    return model, vectorizer
@@ -1,53 +1,98 @@
+import argparse
+import json
 import pandas as pd
 import joblib
-from sklearn.feature_extraction.text import TfidfVectorizer
+from token_vectorizer import TokenTfidfVectorizer
+from fast_model import export_vectorizer, SLIM_VECTORIZER_DIR
 
-# load cleaned data
-df = pd.read_csv("data/processed/cleaned_data.csv")
+CLEAN_PATH = "data/processed/cleaned_data.csv"
 
-print("Columns found:", df.columns)
+# 🔥 improved TF-IDF
+VECTORIZER_PARAMS = {
+    "ngram_range": (1,3),
+    "max_features": 15000,
+    "min_df": 2,
+    "max_df": 0.9,
+}
 
-# ---------------- DETECT TEXT COLUMN ----------------
-if "clean_text" in df.columns:
-    text_col = "clean_text"
-elif "tweet_text" in df.columns:
-    text_col = "tweet_text"
-elif "text" in df.columns:
-    text_col = "text"
-else:
-    raise Exception("❌ Text column not found")
+LABEL_COLUMNS = ["label","class","cyberbullying_type","is_cyberbullying","target"]
 
-# ---------------- DETECT LABEL COLUMN ----------------
-possible_labels = ["label","class","cyberbullying_type","is_cyberbullying","target"]
 
-label_col = None
-for col in possible_labels:
-    if col in df.columns:
-        label_col = col
-        break
+# ---------------- DETECT COLUMNS ----------------
+def detect_columns(df):
+    if "clean_text" in df.columns:
+        text_col = "clean_text"
+    elif "tweet_text" in df.columns:
+        text_col = "tweet_text"
+    elif "text" in df.columns:
+        text_col = "text"
+    else:
+        raise Exception("❌ Text column not found")
 
-if label_col is None:
-    raise Exception("❌ Label column not found")
+    label_col = None
+    for col in LABEL_COLUMNS:
+        if col in df.columns:
+            label_col = col
+            break
 
-print("Using text column:", text_col)
-print("Using label column:", label_col)
+    if label_col is None:
+        raise Exception("❌ Label column not found")
 
-X_text = df[text_col].fillna("")
-y = df[label_col]
+    return text_col, label_col
 
-# 🔥 improved TF-IDF
-vectorizer = TfidfVectorizer(
-    ngram_range=(1,3),
-    max_features=15000,
-    min_df=2,
-    max_df=0.9
-)
 
-X = vectorizer.fit_transform(X_text)
+def load_text_and_labels(path=CLEAN_PATH, verbose=True):
+    df = pd.read_csv(path)
+
+    if verbose:
+        print("Columns found:", df.columns)
+
+    text_col, label_col = detect_columns(df)
+
+    if verbose:
+        print("Using text column:", text_col)
+        print("Using label column:", label_col)
+
+    return df[text_col].fillna(""), df[label_col]
+
+
+def load_params(path):
+    # vectorizer settings picked by search_params.py
+    with open(path) as f:
+        params = json.load(f)["best"]["vectorizer"]
+    params["ngram_range"] = tuple(params["ngram_range"])
+    return params
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--params", default=None, help="search_params.py results file to take vectorizer settings from")
+    parser.add_argument("--compact", action="store_true", help="save float32 features and int8-coded labels (see compact.py)")
+    args = parser.parse_args()
+
+    # load cleaned data
+    X_text, y = load_text_and_labels()
+
+    params = dict(VECTORIZER_PARAMS)
+    if args.params:
+        params.update(load_params(args.params))
+        print("Using searched vectorizer params:", params)
+
+    # same features as TfidfVectorizer, but serving can pass token lists
+    vectorizer = TokenTfidfVectorizer(**params)
+
+    X = vectorizer.fit_transform(X_text)
+
+    if args.compact:
+        from compact import compact_features, compact_labels
+        X, y = compact_features(X), compact_labels(y)
+
+    # save
+    joblib.dump(vectorizer, "models/tfidf_vectorizer.pkl")
+    joblib.dump(X, "models/X_features.pkl")
+    joblib.dump(y, "models/y_labels.pkl")
 
-# save
-joblib.dump(vectorizer, "models/tfidf_vectorizer.pkl")
-joblib.dump(X, "models/X_features.pkl")
-joblib.dump(y, "models/y_labels.pkl")
+    # array export that serving loads instead of the pickle
+    export_vectorizer(vectorizer, SLIM_VECTORIZER_DIR)
 
-print("✅ Improved TF-IDF features created successfully")
\ No newline at end of file
+    print("✅ Improved TF-IDF features created successfully")
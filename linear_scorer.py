@@ -0,0 +1,131 @@
+# Precompiled n-gram -> weight scorer for linear models.
+#
+# For LogisticRegression / LinearSVC on a plain TfidfVectorizer the ML
+# score is a dot product of the l2-normalized TF-IDF row with coef_, so
+# there is no need to build a sparse matrix per comment. compile() folds
+# the vocabulary, idf and coefficients into one dict, and score() walks
+# the comment's n-grams directly, applying the l2 norm analytically.
+#
+# The arithmetic mirrors what sklearn does (column order, count or
+# 1 + log(count) with sublinear_tf, times idf, divide by the row norm,
+# accumulate coef, add intercept), so the result equals ModerationEngine /
+# toxicity_score for the same model.
+import math
+import re
+import numpy as np
+from scipy.special import expit
+from cleaning import word_ngrams
+from fast_model import _check_vectorizer, _probability_kind, MappedVectorizer
+from moderation import aggression_boost, verdict_for
+
+
+class LinearNgramScorer:
+
+    def __init__(self, table, idf, columns, intercept, kind, ngram_range, token_pattern,
+                 lowercase=True, norm="l2", sentiment_ai=None, sublinear_tf=False):
+        self.table = table
+        self.idf = idf
+        self.columns = columns
+        self.intercept = intercept
+        self.kind = kind
+        self.ngram_range = tuple(ngram_range)
+        self.token_re = re.compile(token_pattern)
+        self.lowercase = lowercase
+        self.norm = norm
+        self.sublinear_tf = sublinear_tf
+        self.sentiment_ai = sentiment_ai
+
+    # ---------------- COMPILE ----------------
+    @classmethod
+    def compile(cls, model, vectorizer, sentiment_ai=None):
+        if not isinstance(vectorizer, MappedVectorizer):
+            _check_vectorizer(vectorizer)
+        # same probability kinds as the memory-mapped export
+        kind = _probability_kind(model)
+
+        coef = np.asarray(model.coef_, dtype=np.float64)
+        columns = [tuple(float(w) for w in coef[:, j]) for j in range(coef.shape[1])]
+
+        # n-gram -> column, and per column the coefficient of every class
+        if isinstance(vectorizer, MappedVectorizer):
+            idf = [float(v) for v in vectorizer.idf]
+            table = {t.decode("utf-8"): int(col) for t, col in zip(vectorizer.terms, vectorizer.index)}
+            token_pattern = vectorizer.token_re.pattern
+        else:
+            idf = [float(v) for v in vectorizer.idf_]
+            table = {gram: int(col) for gram, col in vectorizer.vocabulary_.items()}
+            token_pattern = vectorizer.token_pattern
+
+        return cls(
+            table, idf, columns,
+            np.asarray(model.intercept_, dtype=np.float64).ravel(),
+            kind, vectorizer.ngram_range, token_pattern,
+            vectorizer.lowercase, vectorizer.norm, sentiment_ai, vectorizer.sublinear_tf,
+        )
+
+    # ---------------- SCORE ----------------
+    def ngrams(self, text):
+        # cleaned string, or token list from cleaning.tokenize() when the
+        # engine's vectorizer accepts them
+        if isinstance(text, str):
+            text = self.token_re.findall(text.lower() if self.lowercase else text)
+        return word_ngrams(text, self.ngram_range)
+
+    def decision(self, text):
+        counts = {}
+        table = self.table
+        for gram in self.ngrams(text):
+            col = table.get(gram)
+            if col is not None:
+                counts[col] = counts.get(col, 0) + 1
+
+        # same column order and operations as the sparse TF-IDF row
+        cols = sorted(counts)
+        idf = self.idf
+        if self.sublinear_tf:
+            values = [(1 + math.log(counts[col])) * idf[col] for col in cols]
+        else:
+            values = [counts[col] * idf[col] for col in cols]
+
+        if self.norm == "l2":
+            sq = 0.0
+            for v in values:
+                sq += v * v
+            if sq > 0:
+                norm = math.sqrt(sq)
+                values = [v / norm for v in values]
+
+        acc = [0.0] * len(self.intercept)
+        columns = self.columns
+        for col, v in zip(cols, values):
+            for k, w in enumerate(columns[col]):
+                acc[k] += v * w
+
+        return np.array(acc) + self.intercept
+
+    def ml_score(self, text):
+        scores = self.decision(text)
+
+        if self.kind == "softmax":
+            scores = scores - scores.max()
+            np.exp(scores, out=scores)
+            return float(scores[1] / scores.sum())
+        if self.kind == "ovr":
+            # one-vs-rest (liblinear): per-class sigmoids, renormalized
+            p = expit(scores)
+            return float(p[1] / p.sum())
+        if self.kind == "sigmoid":
+            return float(expit(scores[0]))
+        return float(1 / (1 + np.exp(-scores[0])))
+
+    def score(self, cleaned):
+        # same contract as ModerationEngine.toxicity_score (cleaned text in)
+        score = self.ml_score(cleaned)
+
+        if self.sentiment_ai is not None:
+            score += aggression_boost(self.sentiment_ai.polarity_scores(cleaned)["compound"])
+
+        return max(0, min(1, score))
+
+    def verdict(self, cleaned):
+        return verdict_for(self.score(cleaned))
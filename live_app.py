@@ -1,33 +1,13 @@
 import streamlit as st
-import joblib
-import re
-import emoji
 import time
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
+import uuid
+from model_registry import get_engine
+from chat_history import ChatHistory
 
 # -----------------------------
 # Load model & vectorizer
 # -----------------------------
-model = joblib.load("models/Logistic_Regression.pkl")
-vectorizer = joblib.load("models/tfidf_vectorizer.pkl")
-
-# -----------------------------
-# Text cleaning
-# -----------------------------
-stop_words = set(stopwords.words('english'))
-lemmatizer = WordNetLemmatizer()
-
-def clean_text(text):
-    text = text.lower()
-    text = re.sub(r'http\S+|www\S+', '', text)
-    text = emoji.replace_emoji(text, replace='')
-    text = re.sub(r'[^a-z\s]', '', text)
-
-    words = text.split()
-    words = [lemmatizer.lemmatize(w) for w in words if w not in stop_words]
-
-    return " ".join(words)
+engine = get_engine("models/Logistic_Regression.pkl", sentiment=False)
 
 # -----------------------------
 # PAGE CONFIG
@@ -35,13 +15,15 @@ def clean_text(text):
 st.set_page_config(layout="wide")
 st.title("📺 Live Stream Demo with AI Comment Moderation")
 
-# session storage for comments
+# session storage for comments (bounded window, older ones spill to disk)
 if "comments" not in st.session_state:
-    st.session_state.comments = [
+    st.session_state.comments = ChatHistory(channel=uuid.uuid4().hex)
+    for c in [
         "Welcome to the live stream!",
         "Nice video!",
         "This is awesome 🔥"
-    ]
+    ]:
+        st.session_state.comments.append("viewer", c)
 
 # -----------------------------
 # Layout: Video + Comments
@@ -63,8 +45,8 @@ with col2:
     comment_box = st.container()
 
     with comment_box:
-        for c in reversed(st.session_state.comments):
-            st.write("🗨️", c)
+        for c in reversed(st.session_state.comments.visible):
+            st.write("🗨️", c["text"])
 
 # -----------------------------
 # Comment button
@@ -88,14 +70,11 @@ if st.session_state.show_box:
         if comment.strip() == "":
             st.warning("Comment cannot be empty")
         else:
-            cleaned = clean_text(comment)
-            vec = vectorizer.transform([cleaned])
-            prediction = model.predict(vec)[0]
-
-            if prediction == 1:
+            # the engine's score is one class's probability here: block on the label
+            if engine.harmful(comment):
                 st.error("⚠️ Comment blocked: Harmful content detected")
             else:
-                st.session_state.comments.append(comment)
+                st.session_state.comments.append("You", comment)
                 st.success("✅ Comment posted")
                 time.sleep(0.5)
                 st.session_state.show_box = False
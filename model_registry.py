@@ -0,0 +1,139 @@
+# Process-wide model registry shared by the Streamlit apps.
+#
+# Streamlit re-executes the app script on every interaction, but imported
+# modules stay loaded, so artifacts held here are loaded (and warmed up)
+# once per server process. When best_model.pkl or the vectorizer changes
+# on disk, the new engine is loaded and warmed up in a background thread
+# and then swapped in with a single reference assignment; callers that
+# already hold the old engine finish scoring with it undisturbed.
+#
+# A memory-mapped export of the model (models/fast_model/, written by
+# train_models.py) is served instead of the pickle while it is current
+# (see moderation.mapped_model_dir): it loads in milliseconds and every
+# process shares its pages. Its meta.json is watched with the pickles.
+import os
+import threading
+import time
+from datetime import datetime
+from fast_model import FAST_MODEL_DIR
+from moderation import ModerationEngine, MODEL_PATH, VECTORIZER_PATH, load_sentiment, load_artifacts, check_thresholds
+
+WARMUP_TEXTS = ["warm up the moderation pipeline"]
+
+
+def file_signature(*paths):
+    return tuple((os.stat(p).st_mtime_ns, os.stat(p).st_size) for p in paths)
+
+
+def artifact_signature(model_path, vectorizer_path):
+    # the pickles, plus the mapped export when there is one
+    meta = os.path.join(FAST_MODEL_DIR, "meta.json")
+    return file_signature(model_path, vectorizer_path, *([meta] if os.path.exists(meta) else []))
+
+
+class _Entry:
+
+    def __init__(self, engine, signature):
+        self.engine = engine
+        self.signature = signature
+        self.checked_at = time.monotonic()
+
+
+class ModelRegistry:
+
+    def __init__(self, poll_interval=2.0):
+        self.poll_interval = poll_interval
+        self._lock = threading.RLock()
+        self._entries = {}
+        self._reloading = set()
+        self._sentiment_ai = None
+        self.swaps = 0
+
+    # ---------------- SHARED ARTIFACTS ----------------
+    def sentiment_ai(self):
+        if self._sentiment_ai is None:
+            with self._lock:
+                if self._sentiment_ai is None:
+                    self._sentiment_ai = load_sentiment()
+        return self._sentiment_ai
+
+    def _load(self, model_path, vectorizer_path, sentiment):
+        signature = artifact_signature(model_path, vectorizer_path)
+        check_thresholds(model_path, sentiment)
+
+        model, vectorizer = load_artifacts(model_path, vectorizer_path, mapped=True)
+        engine = ModerationEngine(model, vectorizer, self.sentiment_ai() if sentiment else None)
+        engine.version = "{}@{}".format(
+            os.path.basename(model_path),
+            datetime.fromtimestamp(signature[0][0] / 1e9).strftime("%Y%m%d-%H%M%S"),
+        )
+        engine.compile_linear()
+        engine.score_batch(WARMUP_TEXTS)
+
+        return _Entry(engine, signature)
+
+    # ---------------- ENGINE ----------------
+    def engine(self, model_path=MODEL_PATH, vectorizer_path=VECTORIZER_PATH, sentiment=True):
+        key = (model_path, vectorizer_path, sentiment)
+        entry = self._entries.get(key)
+
+        if entry is None:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is None:
+                    entry = self._entries[key] = self._load(*key)
+        else:
+            self._maybe_reload(key, entry)
+
+        return entry.engine
+
+    def preload(self, model_path=MODEL_PATH, vectorizer_path=VECTORIZER_PATH, sentiment=True):
+        # load in the background so a page can draw first; engine() calls
+        # made meanwhile wait on the registry lock instead of loading twice
+        key = (model_path, vectorizer_path, sentiment)
+        if key not in self._entries:
+            threading.Thread(target=self.engine, args=key, daemon=True).start()
+
+    def _maybe_reload(self, key, entry):
+        now = time.monotonic()
+        if now - entry.checked_at < self.poll_interval:
+            return
+        entry.checked_at = now
+
+        try:
+            changed = artifact_signature(key[0], key[1]) != entry.signature
+        except OSError:
+            return
+
+        if not changed:
+            return
+
+        with self._lock:
+            if key in self._reloading:
+                return
+            self._reloading.add(key)
+
+        threading.Thread(target=self._reload, args=(key,), daemon=True).start()
+
+    def _reload(self, key):
+        try:
+            self._entries[key] = self._load(*key)
+            self.swaps += 1
+            print(f"🔄 Hot-swapped model {self._entries[key].engine.version}")
+        except Exception as e:
+            # half-written or broken artifact: keep serving the old engine
+            print(f"⚠️ Model reload failed, keeping previous version: {e}")
+        finally:
+            with self._lock:
+                self._reloading.discard(key)
+
+
+registry = ModelRegistry()
+
+
+def get_engine(model_path=MODEL_PATH, vectorizer_path=VECTORIZER_PATH, sentiment=True):
+    return registry.engine(model_path, vectorizer_path, sentiment)
+
+
+def preload_engine(model_path=MODEL_PATH, vectorizer_path=VECTORIZER_PATH, sentiment=True):
+    registry.preload(model_path, vectorizer_path, sentiment)
@@ -0,0 +1,382 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict, namedtuple
+import numpy as np
+from cleaning import tokenize, ObfuscationNormalizer
+
+MODEL_PATH = os.environ.get("MODERATION_MODEL", "models/best_model.pkl")
+VECTORIZER_PATH = "models/tfidf_vectorizer.pkl"
+
+# ---------------- THRESHOLDS ----------------
+# score <= SAFE_MAX -> safe, score < WARN_MAX -> warn, otherwise block.
+# `evaluate_model.py --sweep` measures cutoffs on the held-out split and
+# writes them to THRESHOLDS_PATH, with the model and sentiment setting they
+# were swept for. They only apply when that model is MODEL_PATH; engines
+# loaded with another model or sentiment setting warn (see
+# check_thresholds). Without the file the defaults apply.
+THRESHOLDS_PATH = os.environ.get("MODERATION_THRESHOLDS", "models/serving_thresholds.json")
+SAFE_MAX = 0.01
+WARN_MAX = 0.03
+THRESHOLDS = None
+
+
+def same_path(a, b):
+    return os.path.normpath(os.path.abspath(a)) == os.path.normpath(os.path.abspath(b))
+
+
+if os.path.exists(THRESHOLDS_PATH):
+    with open(THRESHOLDS_PATH) as f:
+        _thresholds = json.load(f)
+
+    if _thresholds.get("model") and not same_path(_thresholds["model"], MODEL_PATH):
+        print(f"⚠️ {THRESHOLDS_PATH} was swept for {_thresholds['model']}, not {MODEL_PATH}; using default cutoffs")
+    else:
+        THRESHOLDS = _thresholds
+        SAFE_MAX = _thresholds.get("safe_max", SAFE_MAX)
+        WARN_MAX = _thresholds.get("warn_max", WARN_MAX)
+
+
+def check_thresholds(model_path, sentiment):
+    # warn when an engine does not match the configuration the cutoffs were swept for
+    if THRESHOLDS is None:
+        return True
+
+    swept_model, swept_sentiment = THRESHOLDS.get("model"), THRESHOLDS.get("sentiment")
+    problems = []
+    if swept_model and not same_path(swept_model, model_path):
+        problems.append(f"model {model_path} (swept for {swept_model})")
+    if swept_sentiment is not None and swept_sentiment != bool(sentiment):
+        problems.append(f"sentiment={bool(sentiment)} (swept with sentiment={swept_sentiment})")
+
+    if problems:
+        print(f"⚠️ Cutoffs in {THRESHOLDS_PATH} do not match this engine: " + ", ".join(problems))
+    return not problems
+
+# predicted class of non-harmful comments. The score above is column 1 of
+# predict_proba, which for the multi-class dataset model is one harm type,
+# not "harmful"; front-ends without cutoffs swept for it block on the label
+SAFE_LABEL = "not_cyberbullying"
+
+# batches up to this size go through the compiled n-gram scorer
+# (linear_scorer.py) when the model supports it
+SCORER_MAX_BATCH = 8
+
+# per-engine memo of CommentAnalysis objects, keyed by content hash
+ANALYSIS_CACHE_SIZE = 1024
+
+# MODERATION_OBFUSCATION=1 turns on the leetspeak / elongation / spacing
+# normalizer (cleaning.ObfuscationNormalizer) for every engine
+NORMALIZE_OBFUSCATION = os.environ.get("MODERATION_OBFUSCATION", "0") == "1"
+
+Verdict = namedtuple("Verdict", ["text", "cleaned", "score", "verdict"])
+
+
+def verdict_for(score):
+    if score <= SAFE_MAX:
+        return "safe"
+    elif score < WARN_MAX:
+        return "warn"
+    return "block"
+
+
+def aggression_boost(compound):
+    return abs(compound) * 0.25 if compound < 0 else 0
+
+
+def sentiment_label(compound):
+    if compound >= 0.05:
+        return "🙂 Positive"
+    elif compound <= -0.05:
+        return "😠 Negative"
+    else:
+        return "😐 Neutral"
+
+
+# ---------------- ML SCORE ----------------
+def ml_scores(model, X, boost=None):
+    # models can provide their own score (see cascade.py); `boost` is the
+    # aggression boost the caller adds afterwards, for models that decide
+    # on the final serving score
+    if hasattr(model, "ml_scores"):
+        return model.ml_scores(X) if boost is None else model.ml_scores(X, boost)
+    elif hasattr(model, "predict_proba"):
+        return model.predict_proba(X)[:, 1]
+    elif hasattr(model, "decision_function"):
+        s = model.decision_function(X)
+        if s.ndim > 1:
+            s = s[:, 0]
+        return 1 / (1 + np.exp(-s))
+    return np.asarray(model.predict(X), dtype=float)
+
+
+def slim_vectorizer_path(vectorizer_path):
+    # models/tfidf_vectorizer.pkl -> models/tfidf_vectorizer/ (see fast_model.py)
+    return os.path.splitext(vectorizer_path)[0]
+
+
+def load_vectorizer(path=VECTORIZER_PATH):
+    # prefer the slim array export next to the pickle, unless the pickle
+    # has been rewritten since the export was made
+    slim = slim_vectorizer_path(path)
+    meta = os.path.join(slim, "vectorizer.json")
+
+    if os.path.exists(meta) and (not os.path.exists(path) or os.path.getmtime(meta) >= os.path.getmtime(path)):
+        from fast_model import load_vectorizer as load_slim_vectorizer
+        return load_slim_vectorizer(slim)
+
+    import joblib
+    return joblib.load(path)
+
+
+def mapped_model_dir(model_path=MODEL_PATH, vectorizer_path=VECTORIZER_PATH):
+    # the memory-mapped export (see fast_model.py) when it was made from
+    # `model_path` and neither pickle has been rewritten since, else None
+    from fast_model import FAST_MODEL_DIR
+
+    meta = os.path.join(FAST_MODEL_DIR, "meta.json")
+    if not os.path.exists(meta):
+        return None
+    with open(meta) as f:
+        source = json.load(f).get("source")
+
+    if not source or not same_path(source, model_path):
+        return None
+    if any(os.path.exists(p) and os.path.getmtime(p) > os.path.getmtime(meta) for p in (model_path, vectorizer_path)):
+        return None
+    return FAST_MODEL_DIR
+
+
+def load_artifacts(model_path=MODEL_PATH, vectorizer_path=VECTORIZER_PATH, mapped=False):
+    # (model, vectorizer); mapped=True prefers a fresh memory-mapped export,
+    # which loads in milliseconds and shares pages between processes
+    path = mapped_model_dir(model_path, vectorizer_path) if mapped else None
+    if path is not None:
+        from fast_model import load_fast_model
+        return load_fast_model(path)
+
+    import joblib
+    return joblib.load(model_path), load_vectorizer(vectorizer_path)
+
+
+def vectorizer_words(vectorizer):
+    # unigram terms of a TfidfVectorizer or MappedVectorizer
+    if hasattr(vectorizer, "vocabulary_"):
+        terms = vectorizer.vocabulary_
+    else:
+        terms = (t.decode("utf-8") for t in vectorizer.terms.tolist())
+    return {t for t in terms if " " not in t}
+
+
+def load_sentiment(enabled=True):
+    if not enabled:
+        return None
+    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+    return SentimentIntensityAnalyzer()
+
+
+# ---------------- ANALYSIS ----------------
+# Everything the UI and the moderation decision need for one comment,
+# computed once: cleaned text, ML score, VADER compound, final score and
+# verdict. The sparse TF-IDF vector is built on first access only.
+class CommentAnalysis:
+
+    def __init__(self, engine, text, cleaned, ml_score, compound):
+        self.engine = engine
+        self.text = text
+        self.cleaned = cleaned
+        self.ml_score = ml_score
+        self.compound = compound
+        self.score = max(0, min(1, ml_score + aggression_boost(compound)))
+        self.verdict = verdict_for(self.score)
+        self._vector = None
+
+    @property
+    def vector(self):
+        if self._vector is None:
+            self._vector = self.engine.vectorizer.transform([self.cleaned])
+        return self._vector
+
+    @property
+    def sentiment(self):
+        return sentiment_label(self.compound)
+
+
+# ---------------- ENGINE ----------------
+class ModerationEngine:
+    # Cleans, vectorizes and scores a whole list of comments in one
+    # sparse-matrix pass instead of one sklearn call per comment.
+
+    def __init__(self, model, vectorizer, sentiment_ai=None):
+        self.model = model
+        self.vectorizer = vectorizer
+        self.sentiment_ai = sentiment_ai
+        self.version = None
+        self.scorer = None
+        self.near_duplicates = None
+        self.normalizer = None
+        self._analyses = OrderedDict()
+        self._analyses_lock = threading.Lock()
+
+        if NORMALIZE_OBFUSCATION:
+            self.enable_obfuscation_normalizer()
+
+    @classmethod
+    def load(cls, model_path=MODEL_PATH, vectorizer_path=VECTORIZER_PATH, sentiment=True, mapped=False):
+        check_thresholds(model_path, sentiment)
+        model, vectorizer = load_artifacts(model_path, vectorizer_path, mapped)
+        return cls(model, vectorizer, load_sentiment(sentiment))
+
+    @classmethod
+    def load_mapped(cls, path=None, sentiment=True):
+        # memory-mapped artifact written by train_models.py (see fast_model.py)
+        from fast_model import load_fast_model, FAST_MODEL_DIR
+
+        path = path or FAST_MODEL_DIR
+        with open(os.path.join(path, "meta.json")) as f:
+            source = json.load(f).get("source")
+        # cutoffs are swept for the pickle the export was made from
+        check_thresholds(source or MODEL_PATH, sentiment)
+
+        model, vectorizer = load_fast_model(path)
+        return cls(model, vectorizer, load_sentiment(sentiment))
+
+    def compile_linear(self):
+        from linear_scorer import LinearNgramScorer
+
+        try:
+            self.scorer = LinearNgramScorer.compile(self.model, self.vectorizer)
+        except (ValueError, AttributeError):
+            self.scorer = None
+
+        return self.scorer
+
+    def enable_near_duplicates(self, **kwargs):
+        # reuse scores of recent near-identical comments (see near_duplicates.py)
+        from near_duplicates import NearDuplicateIndex
+
+        self.near_duplicates = NearDuplicateIndex(**kwargs)
+        return self.near_duplicates
+
+    def enable_obfuscation_normalizer(self, lexicon=None):
+        # undo leetspeak, elongations and spaced-out letters, by default only
+        # into words the vectorizer knows
+        if lexicon is None:
+            lexicon = vectorizer_words(self.vectorizer)
+
+        self.normalizer = ObfuscationNormalizer(lexicon)
+        with self._analyses_lock:
+            self._analyses.clear()
+        return self.normalizer
+
+    def tokenize(self, text):
+        if self.normalizer is not None:
+            return self.normalizer.tokenize(text)
+        return tokenize(text)
+
+    def compound(self, cleaned):
+        if self.sentiment_ai is None:
+            return 0.0
+        return self.sentiment_ai.polarity_scores(cleaned)["compound"]
+
+    def features_input(self, cleaned, tokens):
+        # vectorizers built on cleaning.word_ngrams (token_vectorizer.py,
+        # the slim export) take tokenize() output as is, which skips
+        # re-tokenizing the joined string
+        if tokens is not None and getattr(self.vectorizer, "accepts_tokens", False):
+            return tokens
+        return cleaned
+
+    def score_cleaned(self, cleaned, tokens=None):
+        if len(cleaned) == 0:
+            return np.zeros(0)
+
+        boost = None
+        if self.sentiment_ai is not None:
+            boost = np.array([aggression_boost(self.compound(t)) for t in cleaned])
+
+        docs = self.features_input(cleaned, tokens)
+        if self.scorer is not None and len(cleaned) <= SCORER_MAX_BATCH:
+            scores = np.array([self.scorer.ml_score(d) for d in docs])
+        else:
+            X = self.vectorizer.transform(docs)
+            scores = ml_scores(self.model, X, boost)
+
+        if boost is not None:
+            scores = scores + boost
+
+        return np.clip(scores, 0, 1)
+
+    def score_deduplicated(self, cleaned, tokens=None):
+        index = self.near_duplicates
+        # near matches reuse only blocked scores (see near_duplicates.py)
+        scores = np.array([index.lookup(t, min_score=WARN_MAX) for t in cleaned], dtype=float)
+
+        # only comments with no recent near-duplicate reach the model
+        misses = np.flatnonzero(np.isnan(scores))
+        if len(misses):
+            scores[misses] = self.score_cleaned(
+                [cleaned[i] for i in misses],
+                [tokens[i] for i in misses] if tokens is not None else None,
+            )
+            for i in misses:
+                index.add(cleaned[i], scores[i])
+
+        return scores
+
+    def score_batch(self, texts):
+        tokens = [self.tokenize(t) for t in texts]
+        cleaned = [" ".join(t) for t in tokens]
+        if self.near_duplicates is not None:
+            scores = self.score_deduplicated(cleaned, tokens)
+        else:
+            scores = self.score_cleaned(cleaned, tokens)
+
+        return [
+            Verdict(text, c, float(s), verdict_for(s))
+            for text, c, s in zip(texts, cleaned, scores)
+        ]
+
+    def score(self, text):
+        return self.score_batch([text])[0]
+
+    def labels(self, texts):
+        # predicted classes, in one vectorizer and model pass
+        tokens = [self.tokenize(t) for t in texts]
+        cleaned = [" ".join(t) for t in tokens]
+        return self.model.predict(self.vectorizer.transform(self.features_input(cleaned, tokens)))
+
+    def harmful(self, text):
+        return str(self.labels([text])[0]) != SAFE_LABEL
+
+    def toxicity_score(self, cleaned):
+        return float(self.score_cleaned([cleaned])[0])
+
+    def analyze(self, text):
+        key = hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+        with self._analyses_lock:
+            cached = self._analyses.get(key)
+            if cached is not None:
+                self._analyses.move_to_end(key)
+                return cached
+
+        tokens = self.tokenize(text)
+        cleaned = " ".join(tokens)
+        doc = self.features_input(cleaned, tokens)
+        compound = self.compound(cleaned)
+        if self.scorer is not None:
+            ml_score = self.scorer.ml_score(doc)
+        else:
+            boost = np.array([aggression_boost(compound)])
+            ml_score = float(ml_scores(self.model, self.vectorizer.transform([doc]), boost)[0])
+
+        analysis = CommentAnalysis(self, text, cleaned, ml_score, compound)
+
+        with self._analyses_lock:
+            self._analyses[key] = analysis
+            if len(self._analyses) > ANALYSIS_CACHE_SIZE:
+                self._analyses.popitem(last=False)
+
+        return analysis
@@ -0,0 +1,265 @@
+# Append-only audit log of moderation decisions.
+#
+#   python moderation_log.py --user You --since 3600
+#   python moderation_log.py --buckets 300
+#
+# record() only puts a row on an in-memory queue, so the send path never
+# waits on disk. A background writer drains the queue and group-commits
+# whatever has arrived (up to FLUSH_ROWS rows or FLUSH_SECONDS of waiting)
+# in one transaction to a WAL-mode SQLite file. A failed commit (database
+# locked, disk full) is retried a few times, then the batch is counted in
+# `failed` and dropped, so the writer never dies and flush() never hangs.
+# Rows are never updated or deleted; only the hash of the comment text is
+# stored. `user` is a stable id of the sender (the apps use a per-visitor
+# session id), `name` the display name they chatted under.
+import argparse
+import atexit
+import hashlib
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+LOG_DB = os.environ.get("MODERATION_LOG", "data/moderation_log.sqlite3")
+FLUSH_ROWS = 512
+FLUSH_SECONDS = 0.5
+QUEUE_SIZE = 100000
+WRITE_RETRIES = 3
+RETRY_SECONDS = 0.2
+
+VERDICTS = ("safe", "warn", "block")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS decisions (
+    id            INTEGER PRIMARY KEY,
+    ts            REAL NOT NULL,
+    user          TEXT NOT NULL,
+    name          TEXT,
+    text_hash     TEXT NOT NULL,
+    score         REAL NOT NULL,
+    compound      REAL,
+    verdict       TEXT NOT NULL,
+    model_version TEXT
+);
+CREATE INDEX IF NOT EXISTS decisions_ts ON decisions (ts);
+CREATE INDEX IF NOT EXISTS decisions_user_ts ON decisions (user, ts);
+"""
+
+INSERT = (
+    "INSERT INTO decisions (ts, user, text_hash, score, compound, verdict, model_version, name) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+# per-verdict counts plus score stats, shared by both aggregate queries
+AGGREGATES = (
+    "COUNT(*), "
+    + ", ".join(f"SUM(verdict = '{v}')" for v in VERDICTS)
+    + ", AVG(score), MAX(score)"
+)
+
+
+def text_hash(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def connect(path):
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    db = sqlite3.connect(path, check_same_thread=False)
+    # WAL lets readers query while the writer appends; NORMAL sync is
+    # durable across application crashes and much cheaper per commit
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    columns = [col[1] for col in db.execute("PRAGMA table_info(decisions)")]
+    if columns and "name" not in columns:
+        # file written before display names were logged
+        db.execute("ALTER TABLE decisions ADD COLUMN name TEXT")
+    db.executescript(SCHEMA)
+    return db
+
+
+def summary_row(row):
+    total, *counts, avg_score, max_score = row
+    return {
+        "comments": total,
+        **{v: int(n or 0) for v, n in zip(VERDICTS, counts)},
+        "avg_score": avg_score,
+        "max_score": max_score,
+    }
+
+
+class ModerationLog:
+
+    def __init__(self, db_path=LOG_DB, flush_rows=FLUSH_ROWS, flush_seconds=FLUSH_SECONDS, writer=True):
+        self.db_path = db_path
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.dropped = 0
+        self.failed = 0
+        self.written = 0
+        self.commits = 0
+
+        self._queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self._db = connect(db_path)
+        self._read_lock = threading.Lock()
+        self._closed = threading.Event()
+        # writer=False opens the log for queries only (the CLI below)
+        self._writer = threading.Thread(target=self._write_loop, daemon=True) if writer else None
+        if self._writer is not None:
+            self._writer.start()
+
+    # ---------------- WRITE ----------------
+    def record(self, text, user, score, verdict, compound=None, model_version=None, ts=None, name=None):
+        if self._writer is None:
+            raise RuntimeError("moderation log opened without a writer")
+
+        row = (time.time() if ts is None else ts, user, text_hash(text), float(score),
+               None if compound is None else float(compound), verdict, model_version, name)
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            # never block the send path; a full queue means the disk is
+            # far behind, so the row is counted and dropped
+            self.dropped += 1
+
+    def record_analysis(self, analysis, user, model_version=None, name=None):
+        self.record(analysis.text, user, analysis.score, analysis.verdict,
+                    analysis.compound, model_version, name=name)
+
+    def _write_loop(self):
+        db = connect(self.db_path)
+
+        while not (self._closed.is_set() and self._queue.empty()):
+            try:
+                batch = [self._queue.get(timeout=0.1)]
+            except queue.Empty:
+                continue
+
+            deadline = time.monotonic() + self.flush_seconds
+            while len(batch) < self.flush_rows:
+                try:
+                    batch.append(self._queue.get(timeout=max(0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+
+            try:
+                self._commit(db, batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+        db.close()
+
+    def _commit(self, db, batch):
+        for attempt in range(WRITE_RETRIES + 1):
+            try:
+                with db:
+                    db.executemany(INSERT, batch)
+                self.written += len(batch)
+                self.commits += 1
+                return
+            except sqlite3.Error as e:
+                error = e
+                time.sleep(RETRY_SECONDS * 2 ** attempt)
+
+        self.failed += len(batch)
+        print(f"⚠️ Moderation log write failed, dropped {len(batch)} rows: {error}")
+
+    def flush(self):
+        self._queue.join()
+
+    def close(self):
+        self._closed.set()
+        if self._writer is not None:
+            self._writer.join()
+        self._db.close()
+
+    # ---------------- QUERY ----------------
+    def _query(self, sql, params):
+        with self._read_lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def user_summary(self, user, since=None, until=None):
+        row = self._query(
+            f"SELECT {AGGREGATES} FROM decisions WHERE user = ? AND ts >= ? AND ts < ?",
+            (user, since or 0, until or float("inf")),
+        )[0]
+        return summary_row(row)
+
+    def users(self, since=None, until=None, verdict=None, limit=20):
+        # users with the most decisions (optionally of one verdict) in the range
+        rows = self._query(
+            f"SELECT user, MAX(name), {AGGREGATES} FROM decisions WHERE ts >= ? AND ts < ? "
+            + ("AND verdict = ? " if verdict else "")
+            + "GROUP BY user ORDER BY COUNT(*) DESC LIMIT ?",
+            (since or 0, until or float("inf"), *([verdict] if verdict else []), limit),
+        )
+        return [{"user": r[0], "name": r[1], **summary_row(r[2:])} for r in rows]
+
+    def time_buckets(self, bucket_seconds=60, since=None, until=None, user=None):
+        rows = self._query(
+            f"SELECT CAST(ts / ? AS INTEGER) * ? AS bucket, {AGGREGATES} FROM decisions "
+            "WHERE ts >= ? AND ts < ? "
+            + ("AND user = ? " if user else "")
+            + "GROUP BY bucket ORDER BY bucket",
+            (bucket_seconds, bucket_seconds, since or 0, until or float("inf"), *([user] if user else [])),
+        )
+        return [{"bucket_start": r[0], **summary_row(r[1:])} for r in rows]
+
+    def recent(self, user=None, verdict=None, limit=50):
+        where, params = [], []
+        if user:
+            where.append("user = ?")
+            params.append(user)
+        if verdict:
+            where.append("verdict = ?")
+            params.append(verdict)
+
+        rows = self._query(
+            "SELECT ts, user, name, text_hash, score, compound, verdict, model_version FROM decisions "
+            + ("WHERE " + " AND ".join(where) + " " if where else "")
+            + "ORDER BY id DESC LIMIT ?",
+            (*params, limit),
+        )
+        columns = ("ts", "user", "name", "text_hash", "score", "compound", "verdict", "model_version")
+        return [dict(zip(columns, r)) for r in rows]
+
+
+# ---------------- SHARED LOG ----------------
+# one writer per process, shared by every Streamlit session
+_logs = {}
+_logs_lock = threading.Lock()
+
+
+def get_log(db_path=LOG_DB):
+    with _logs_lock:
+        if db_path not in _logs:
+            _logs[db_path] = ModerationLog(db_path)
+            atexit.register(_logs[db_path].close)
+        return _logs[db_path]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", default=LOG_DB)
+    parser.add_argument("--user", default=None)
+    parser.add_argument("--since", type=float, default=None, help="only the last N seconds")
+    parser.add_argument("--buckets", type=float, default=None, help="verdict mix per N-second bucket")
+    args = parser.parse_args()
+
+    log = ModerationLog(args.db, writer=False)
+    since = time.time() - args.since if args.since else None
+
+    if args.buckets:
+        for row in log.time_buckets(args.buckets, since=since, user=args.user):
+            stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(row["bucket_start"]))
+            print(f"{stamp}  n={row['comments']:>6}  safe {row['safe']:>5}  warn {row['warn']:>5}  block {row['block']:>5}")
+    elif args.user:
+        print(log.user_summary(args.user, since=since))
+    else:
+        print(f"{'user':<33} {'name':<12} {'comments':>9} {'safe':>6} {'warn':>6} {'block':>6} {'max score':>10}")
+        for row in log.users(since=since):
+            print(f"{row['user']:<33} {row['name'] or '':<12} {row['comments']:>9} {row['safe']:>6} {row['warn']:>6} {row['block']:>6} {row['max_score']:>10.3f}")
+
+    log.close()
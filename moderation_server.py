@@ -0,0 +1,282 @@
+# Headless HTTP moderation service (stdlib asyncio only).
+#
+#   python moderation_server.py --port 8000 --max-batch-size 64 --max-wait-ms 5
+#
+#   POST /moderate  {"text": "..."} or {"texts": ["...", ...]}
+#   GET  /health
+#   GET  /stats
+import argparse
+import asyncio
+import json
+import time
+from cascade import CascadeModel
+from cleaning import lemma_cache_stats
+from moderation import ModerationEngine, MODEL_PATH, VECTORIZER_PATH
+
+MAX_BODY_BYTES = 1 << 20
+
+STATUS_TEXT = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+# ---------------- MICRO-BATCHING ----------------
+# Concurrent requests are queued per comment. A single worker collects up
+# to `max_batch_size` comments, waiting at most `max_wait_ms` after the
+# first one arrives, and scores them with one engine call in a thread so
+# the event loop keeps accepting connections.
+class MicroBatcher:
+
+    def __init__(self, engine, max_batch_size=64, max_wait_ms=5.0):
+        self.engine = engine
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue = asyncio.Queue()
+        self.batches = 0
+        self.comments = 0
+        self.busy_seconds = 0.0
+        self._worker = None
+
+    def start(self):
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, texts):
+        loop = asyncio.get_running_loop()
+        futures = []
+
+        for text in texts:
+            future = loop.create_future()
+            self.queue.put_nowait((text, future))
+            futures.append(future)
+
+        return await asyncio.gather(*futures)
+
+    async def _collect(self):
+        batch = [await self.queue.get()]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = await self._collect()
+            texts = [text for text, _ in batch]
+
+            start = time.perf_counter()
+            try:
+                results = await loop.run_in_executor(None, self.engine.score_batch, texts)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            finally:
+                self.busy_seconds += time.perf_counter() - start
+
+            self.batches += 1
+            self.comments += len(batch)
+
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "comments": self.comments,
+            "avg_batch_size": self.comments / self.batches if self.batches else 0.0,
+            "queued": self.queue.qsize(),
+            "busy_seconds": self.busy_seconds,
+        }
+
+
+# ---------------- HTTP ----------------
+class HTTPError(Exception):
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+async def read_request(reader):
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+
+    try:
+        method, path, version = request_line.decode("latin-1").split()
+    except ValueError:
+        raise HTTPError(400, "malformed request line")
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get("content-length", 0) or 0)
+    except ValueError:
+        raise HTTPError(400, "invalid Content-Length")
+    if length < 0:
+        raise HTTPError(400, "invalid Content-Length")
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(413, "request body too large")
+
+    body = await reader.readexactly(length) if length else b""
+    keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+
+    return method, path.split("?", 1)[0], body, keep_alive
+
+
+def write_response(writer, status, payload, keep_alive):
+    body = json.dumps(payload).encode()
+    head = (
+        f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    writer.write(head.encode() + body)
+
+
+def parse_texts(body):
+    try:
+        data = json.loads(body or b"{}")
+    except ValueError:
+        raise HTTPError(400, "body must be JSON")
+
+    if isinstance(data, dict) and isinstance(data.get("text"), str):
+        return [data["text"]]
+    if isinstance(data, dict) and isinstance(data.get("texts"), list):
+        if all(isinstance(t, str) for t in data["texts"]):
+            return data["texts"]
+
+    raise HTTPError(400, 'expected {"text": str} or {"texts": [str, ...]}')
+
+
+class ModerationServer:
+
+    def __init__(self, engine, max_batch_size=64, max_wait_ms=5.0):
+        self.batcher = MicroBatcher(engine, max_batch_size, max_wait_ms)
+        self.started = time.time()
+
+    async def route(self, method, path, body):
+        if path == "/moderate":
+            if method != "POST":
+                raise HTTPError(405, "use POST")
+
+            results = await self.batcher.submit(parse_texts(body))
+            return {
+                "results": [
+                    {"text": r.text, "score": r.score, "verdict": r.verdict}
+                    for r in results
+                ]
+            }
+
+        if path == "/health":
+            return {"status": "ok", "uptime_s": time.time() - self.started}
+
+        if path == "/stats":
+            stats = {"batching": self.batcher.stats(), "lemma_cache": lemma_cache_stats()}
+            index = self.batcher.engine.near_duplicates
+            if index is not None:
+                stats["near_duplicates"] = {**index.stats(), "raids": index.raids()}
+            if isinstance(self.batcher.engine.model, CascadeModel):
+                stats["cascade"] = self.batcher.engine.model.stats()
+            return stats
+
+        raise HTTPError(404, f"no route for {path}")
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                keep_alive = False
+                try:
+                    request = await read_request(reader)
+                    if request is None:
+                        break
+                    method, path, body, keep_alive = request
+                    status, payload = 200, await self.route(method, path, body)
+                except HTTPError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except Exception as e:
+                    # an engine failure still gets a response
+                    print(f"⚠️ Request failed: {e!r}")
+                    status, payload = 500, {"error": "internal error"}
+
+                write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8000):
+        self.batcher.start()
+        server = await asyncio.start_server(self.handle, host, port)
+
+        print(f"✅ Moderation service listening on http://{host}:{port}")
+
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.batcher.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--vectorizer", default=VECTORIZER_PATH)
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--no-sentiment", action="store_true", help="skip the VADER aggression boost")
+    parser.add_argument("--pickled", action="store_true", help="load the pickled model even when a current memory-mapped export exists")
+    parser.add_argument("--near-duplicates", action="store_true", help="reuse scores of recent near-duplicate comments")
+    parser.add_argument("--dedupe-ttl", type=float, default=300, help="seconds a comment stays reusable without hits")
+    parser.add_argument("--normalize-obfuscation", action="store_true", help="undo leetspeak, elongations and spaced-out letters")
+    args = parser.parse_args()
+
+    engine = ModerationEngine.load(args.model, args.vectorizer, sentiment=not args.no_sentiment, mapped=not args.pickled)
+    if args.near_duplicates:
+        engine.enable_near_duplicates(ttl=args.dedupe_ttl)
+    if args.normalize_obfuscation:
+        engine.enable_obfuscation_normalizer()
+    server = ModerationServer(engine, args.max_batch_size, args.max_wait_ms)
+
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,214 @@
+# Near-duplicate verdict reuse for raid traffic.
+#
+# Raids repeat one message thousands of times with small edits ("u r an
+# idiot", "u r an idiiot!!"). Each cleaned comment gets a MinHash
+# signature over character shingles; LSH banding finds earlier comments
+# that probably share most shingles, and if the estimated Jaccard
+# similarity clears the threshold the earlier score is reused instead of
+# running TF-IDF and the model again. Identical cleaned texts skip the
+# signature entirely.
+#
+# Reuse policy: an exact match always reuses the cached score. A near
+# (non-exact) match only does when the cached score is at least
+# `min_score` (the block cutoff, passed by the engine), or when every
+# word of the new comment already occurs in the cached one. So a safe or
+# warn score is never served to a copy with added or swapped words
+# ("<approved text> kill yourself"); that copy goes to the model.
+#
+# Entries expire after `ttl` seconds without a hit. Each entry is the
+# root of a cluster that counts the copies answered from it, so sustained
+# raids show up in stats() and raids().
+import threading
+import time
+import zlib
+from collections import OrderedDict
+import numpy as np
+
+NUM_PERM = 64
+BANDS = 16
+SHINGLE = 4
+THRESHOLD = 0.8
+TTL_SECONDS = 300
+MAX_ENTRIES = 50000
+
+
+class _Entry:
+
+    __slots__ = ("cleaned", "signature", "keys", "score", "seen_at")
+
+    def __init__(self, cleaned, signature, keys, score, seen_at):
+        self.cleaned = cleaned
+        self.signature = signature
+        self.keys = keys
+        self.score = score
+        self.seen_at = seen_at
+
+
+class NearDuplicateIndex:
+
+    def __init__(self, num_perm=NUM_PERM, bands=BANDS, shingle=SHINGLE, threshold=THRESHOLD,
+                 ttl=TTL_SECONDS, max_entries=MAX_ENTRIES, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+
+        self.rows = num_perm // bands
+        self.bands = bands
+        self.shingle = shingle
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        # multiply-shift hash family: h(x) = (a*x + b) mod 2^64 >> 32
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 2**63, num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2**63, num_perm, dtype=np.uint64)
+
+        self._entries = OrderedDict()   # cleaned text -> _Entry, oldest first
+        self._buckets = [{} for _ in range(bands)]
+        self._clusters = {}             # cleaned text -> raid counters
+        self._lock = threading.Lock()
+
+        self.lookups = 0
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.near_rejected = 0
+        self.evicted = 0
+
+    # ---------------- SIGNATURE ----------------
+    def signature(self, cleaned):
+        k = self.shingle
+        shingles = {cleaned[i:i + k] for i in range(max(1, len(cleaned) - k + 1))}
+        x = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+
+        with np.errstate(over="ignore"):
+            return ((np.outer(x, self._a) + self._b) >> np.uint64(32)).min(axis=0)
+
+    def band_keys(self, signature):
+        r = self.rows
+        return [signature[i * r:(i + 1) * r].tobytes() for i in range(self.bands)]
+
+    # ---------------- INDEX ----------------
+    def _evict(self, now):
+        while self._entries:
+            cleaned, entry = next(iter(self._entries.items()))
+            if now - entry.seen_at < self.ttl and len(self._entries) <= self.max_entries:
+                break
+            self._remove(cleaned, entry)
+
+    def _remove(self, cleaned, entry):
+        del self._entries[cleaned]
+        self.evicted += 1
+
+        for bucket, key in zip(self._buckets, entry.keys):
+            members = bucket.get(key)
+            if members is not None:
+                members.discard(cleaned)
+                if not members:
+                    del bucket[key]
+        del self._clusters[cleaned]
+
+    def _hit(self, entry, now, exact):
+        entry.seen_at = now
+        self._entries.move_to_end(entry.cleaned)
+
+        cluster = self._clusters[entry.cleaned]
+        cluster["hits"] += 1
+        cluster["last_seen"] = now
+        if exact:
+            self.exact_hits += 1
+        else:
+            self.near_hits += 1
+        return entry.score
+
+    def reusable(self, entry, words, min_score):
+        # near matches: only blocked scores, or copies that add no new words
+        if min_score is not None and entry.score >= min_score:
+            return True
+        return words <= set(entry.cleaned.split())
+
+    def lookup(self, cleaned, now=None, min_score=None):
+        # cached score for `cleaned` or a reusable near-duplicate of it, else None
+        if not cleaned:
+            return None
+        now = now or time.monotonic()
+
+        with self._lock:
+            self.lookups += 1
+            self._evict(now)
+
+            entry = self._entries.get(cleaned)
+            if entry is not None:
+                return self._hit(entry, now, exact=True)
+
+        signature = self.signature(cleaned)
+
+        with self._lock:
+            candidates = set()
+            for bucket, key in zip(self._buckets, self.band_keys(signature)):
+                candidates.update(bucket.get(key, ()))
+
+            words = set(cleaned.split())
+            best, best_similarity, rejected = None, self.threshold, False
+            for candidate in candidates:
+                entry = self._entries[candidate]
+                similarity = np.count_nonzero(entry.signature == signature) / len(signature)
+                if similarity < best_similarity:
+                    continue
+                if not self.reusable(entry, words, min_score):
+                    rejected = True
+                    continue
+                best, best_similarity = entry, similarity
+
+            if best is None and rejected:
+                self.near_rejected += 1
+            if best is not None:
+                return self._hit(best, now, exact=False)
+        return None
+
+    def add(self, cleaned, score, now=None):
+        if not cleaned:
+            return
+        now = now or time.monotonic()
+        signature = self.signature(cleaned)
+        keys = self.band_keys(signature)
+
+        with self._lock:
+            if cleaned in self._entries:
+                return
+
+            self._entries[cleaned] = _Entry(cleaned, signature, keys, score, now)
+            for bucket, key in zip(self._buckets, keys):
+                bucket.setdefault(key, set()).add(cleaned)
+
+            self._clusters[cleaned] = {
+                "sample": cleaned,
+                "score": score,
+                "hits": 0,
+                "first_seen": now,
+                "last_seen": now,
+            }
+            self._evict(now)
+
+    # ---------------- COUNTERS ----------------
+    def raids(self, min_hits=20, limit=10):
+        with self._lock:
+            clusters = [c for c in self._clusters.values() if c["hits"] >= min_hits]
+
+        clusters.sort(key=lambda c: -c["hits"])
+        return [
+            {**c, "hits_per_s": c["hits"] / max(c["last_seen"] - c["first_seen"], 1e-9)}
+            for c in clusters[:limit]
+        ]
+
+    def stats(self):
+        hits = self.exact_hits + self.near_hits
+        return {
+            "lookups": self.lookups,
+            "exact_hits": self.exact_hits,
+            "near_hits": self.near_hits,
+            "near_rejected": self.near_rejected,
+            "hit_rate": hits / self.lookups if self.lookups else 0.0,
+            "entries": len(self._entries),
+            "clusters": len(self._clusters),
+            "evicted": self.evicted,
+        }
@@ -1,42 +1,81 @@
+import argparse
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
-import re
-import emoji
-import nltk
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
+from cleaning import clean_text, lemma_cache_stats
 
-# load dataset
-df = pd.read_csv("data/raw/cyberbullying_tweets.csv")
+RAW_PATH = "data/raw/cyberbullying_tweets.csv"
+CLEAN_PATH = "data/processed/cleaned_data.csv"
 
-# initialize tools
-stop_words = set(stopwords.words('english'))
-lemmatizer = WordNetLemmatizer()
 
-def clean_text(text):
-    text = str(text).lower()
+def clean_texts(texts):
+    return [clean_text(t) for t in texts]
 
-    # remove URLs
-    text = re.sub(r'http\S+|www\S+', '', text)
 
-    # remove emojis
-    text = emoji.replace_emoji(text, replace='')
+# ---------------- IN-MEMORY ----------------
+def preprocess(src=RAW_PATH, dst=CLEAN_PATH):
+    df = pd.read_csv(src)
 
-    # remove punctuation & numbers
-    text = re.sub(r'[^a-z\s]', '', text)
+    # apply cleaning
+    df["clean_text"] = df.iloc[:,0].apply(clean_text)
 
-    # tokenize
-    words = text.split()
+    # save cleaned dataset
+    df.to_csv(dst, index=False)
 
-    # remove stopwords & lemmatize
-    words = [lemmatizer.lemmatize(word) for word in words if word not in stop_words]
+    return df
 
-    return " ".join(words)
 
-# apply cleaning
-df["clean_text"] = df.iloc[:,0].apply(clean_text)
+# ---------------- STREAMING ----------------
+# Reads the CSV in chunks, cleans them across a process pool and appends
+# each cleaned chunk to the output in the original row order. At most
+# `workers * 2` chunks are in flight, so memory stays bounded.
+def preprocess_streaming(src=RAW_PATH, dst=CLEAN_PATH, chunksize=50000, workers=None):
+    workers = workers or os.cpu_count()
+    rows = 0
+    first = True
 
-# save cleaned dataset
-df.to_csv("data/processed/cleaned_data.csv", index=False)
+    def write(chunk, cleaned):
+        nonlocal rows, first
+        chunk["clean_text"] = cleaned
+        chunk.to_csv(dst, mode="w" if first else "a", header=first, index=False)
+        rows += len(chunk)
+        first = False
 
-print("\nSample cleaned text:\n")
-print(df[["clean_text"]].head())
\ No newline at end of file
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+
+        for chunk in pd.read_csv(src, chunksize=chunksize):
+            pending.append((chunk, pool.submit(clean_texts, chunk.iloc[:,0].tolist())))
+
+            if len(pending) >= workers * 2:
+                chunk, future = pending.popleft()
+                write(chunk, future.result())
+
+        while pending:
+            chunk, future = pending.popleft()
+            write(chunk, future.result())
+
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", default=RAW_PATH)
+    parser.add_argument("--output", default=CLEAN_PATH)
+    parser.add_argument("--stream", action="store_true", help="chunked, multi-process cleaning")
+    parser.add_argument("--chunksize", type=int, default=50000)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.stream:
+        rows = preprocess_streaming(args.input, args.output, args.chunksize, args.workers)
+        print(f"✅ Cleaned {rows} rows → {args.output}")
+    else:
+        df = preprocess(args.input, args.output)
+
+        print("\nSample cleaned text:\n")
+        print(df[["clean_text"]].head())
+
+        stats = lemma_cache_stats()
+        print(f"\nLemma cache: {stats['hit_rate']:.1%} hit rate, {stats['size']}/{stats['maxsize']} entries")
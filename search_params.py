@@ -0,0 +1,210 @@
+# Cross-validated successive-halving search over vectorizer and
+# classifier settings.
+#
+#   python search_params.py --candidates 32 --folds 3
+#   python features.py --params models/search_results.json
+#
+# Each fold's training text is tokenized into raw n-gram counts once per
+# ngram_range. min_df / max_df / max_features / sublinear_tf are then
+# applied as column selection + TfidfTransformer on those cached counts,
+# so trying a new classifier or idf setting never re-tokenizes the corpus.
+# After each halving round the cached matrices of dropped candidates are
+# freed, so memory follows the surviving candidates, not all of them.
+import argparse
+import json
+import math
+import random
+import time
+import numpy as np
+from sklearn.base import clone
+from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import StratifiedKFold
+from sklearn.svm import LinearSVC
+from features import load_text_and_labels, CLEAN_PATH, VECTORIZER_PARAMS
+
+RESULTS_PATH = "models/search_results.json"
+
+# ---------------- SEARCH SPACE ----------------
+VECTORIZER_SPACE = {
+    "ngram_range": [(1,1), (1,2), (1,3)],
+    "min_df": [1, 2, 5],
+    "max_df": [0.7, 0.9, 1.0],
+    "max_features": [5000, 15000, 30000],
+    "sublinear_tf": [False, True],
+}
+
+CLASSIFIERS = {
+    "Logistic Regression": (
+        LogisticRegression(max_iter=2000, class_weight='balanced'),
+        {"C": [0.3, 1.0, 3.0, 10.0]},
+    ),
+    "Linear SVM": (
+        LinearSVC(class_weight='balanced'),
+        {"C": [0.1, 0.3, 1.0]},
+    ),
+}
+
+
+def sample_candidates(n, seed=42):
+    rng = random.Random(seed)
+    seen, candidates = set(), []
+
+    # always include the current production settings
+    default = dict(VECTORIZER_PARAMS, sublinear_tf=False)
+    pool = [(default, "Logistic Regression", {"C": 1.0})]
+
+    for _ in range(n * 20):
+        if len(pool) >= n:
+            break
+        vec = {k: rng.choice(v) for k, v in VECTORIZER_SPACE.items()}
+        clf = rng.choice(list(CLASSIFIERS))
+        clf_params = {k: rng.choice(v) for k, v in CLASSIFIERS[clf][1].items()}
+        pool.append((vec, clf, clf_params))
+
+    for vec, clf, clf_params in pool:
+        key = json.dumps([vec, clf, clf_params], sort_keys=True, default=list)
+        if key not in seen:
+            seen.add(key)
+            candidates.append({"vectorizer": vec, "classifier": clf, "params": clf_params})
+
+    return candidates
+
+
+# ---------------- FOLD CACHE ----------------
+def vec_key(vec):
+    return json.dumps(vec, sort_keys=True, default=list)
+
+
+class FoldFeatureCache:
+
+    def __init__(self, texts, y, folds=3, seed=42):
+        self.texts = np.asarray(texts, dtype=object)
+        self.y = np.asarray(y)
+        self.splits = list(StratifiedKFold(folds, shuffle=True, random_state=seed).split(self.texts, self.y))
+        self._counts = {}
+        self._tfidf = {}
+        self.tokenize_seconds = 0.0
+
+    def counts(self, fold, ngram_range):
+        key = (fold, ngram_range)
+        if key not in self._counts:
+            train, val = self.splits[fold]
+
+            start = time.perf_counter()
+            counter = CountVectorizer(ngram_range=ngram_range)
+            C_train = counter.fit_transform(self.texts[train]).tocsc()
+            C_val = counter.transform(self.texts[val]).tocsc()
+            self.tokenize_seconds += time.perf_counter() - start
+
+            df = np.diff(C_train.indptr)
+            tf = np.asarray(C_train.sum(axis=0)).ravel()
+            self._counts[key] = (C_train, C_val, df, tf)
+
+        return self._counts[key]
+
+    def features(self, fold, vec):
+        key = (fold, vec_key(vec))
+        if key not in self._tfidf:
+            C_train, C_val, df, tf = self.counts(fold, tuple(vec["ngram_range"]))
+            n_docs = C_train.shape[0]
+
+            # same pruning rules as TfidfVectorizer._limit_features
+            min_df = vec["min_df"] if isinstance(vec["min_df"], int) else vec["min_df"] * n_docs
+            max_df = vec["max_df"] * n_docs if isinstance(vec["max_df"], float) else vec["max_df"]
+            keep = np.flatnonzero((df >= min_df) & (df <= max_df))
+
+            if vec["max_features"] is not None and len(keep) > vec["max_features"]:
+                keep = np.sort(keep[(-tf[keep]).argsort()[:vec["max_features"]]])
+
+            tfidf = TfidfTransformer(sublinear_tf=vec["sublinear_tf"])
+            X_train = tfidf.fit_transform(C_train[:, keep].tocsr())
+            X_val = tfidf.transform(C_val[:, keep].tocsr())
+            self._tfidf[key] = (X_train, X_val)
+
+        return self._tfidf[key]
+
+    def keep_only(self, candidates):
+        # free the matrices no surviving candidate uses
+        vecs = {vec_key(c["vectorizer"]) for c in candidates}
+        ngrams = {tuple(c["vectorizer"]["ngram_range"]) for c in candidates}
+
+        self._tfidf = {k: v for k, v in self._tfidf.items() if k[1] in vecs}
+        self._counts = {k: v for k, v in self._counts.items() if k[1] in ngrams}
+
+    def score(self, candidate, n_samples):
+        scores = []
+        base, _ = CLASSIFIERS[candidate["classifier"]]
+
+        for fold, (train, val) in enumerate(self.splits):
+            X_train, X_val = self.features(fold, candidate["vectorizer"])
+            rows = np.random.RandomState(fold).permutation(X_train.shape[0])[:n_samples]
+
+            model = clone(base).set_params(**candidate["params"])
+            model.fit(X_train[rows], self.y[train][rows])
+            scores.append(accuracy_score(self.y[val], model.predict(X_val)))
+
+        return float(np.mean(scores))
+
+
+# ---------------- SUCCESSIVE HALVING ----------------
+def successive_halving(cache, candidates, factor=3, min_samples=2000):
+    full = min(len(train) for train, _ in cache.splits)
+    n_samples = min(min_samples, full)
+    rounds = []
+
+    while True:
+        start = time.perf_counter()
+        for c in candidates:
+            c["score"] = cache.score(c, n_samples)
+        candidates.sort(key=lambda c: -c["score"])
+
+        rounds.append({
+            "n_samples": n_samples,
+            "n_candidates": len(candidates),
+            "best_score": candidates[0]["score"],
+            "seconds": time.perf_counter() - start,
+        })
+        print(f"🔎 {len(candidates):>3} candidates on {n_samples:>7} rows → best {candidates[0]['score']:.4f}")
+
+        if len(candidates) == 1 or n_samples >= full:
+            break
+
+        candidates = candidates[:max(1, math.ceil(len(candidates) / factor))]
+        cache.keep_only(candidates)
+        n_samples = min(full, n_samples * factor)
+
+    return candidates, rounds
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", default=CLEAN_PATH)
+    parser.add_argument("--candidates", type=int, default=32)
+    parser.add_argument("--folds", type=int, default=3)
+    parser.add_argument("--factor", type=int, default=3)
+    parser.add_argument("--min-samples", type=int, default=2000)
+    parser.add_argument("--output", default=RESULTS_PATH)
+    args = parser.parse_args()
+
+    X_text, y = load_text_and_labels(args.input)
+
+    cache = FoldFeatureCache(X_text, y, args.folds)
+    candidates = sample_candidates(args.candidates)
+
+    print(f"\n🚀 Searching {len(candidates)} candidates with {args.folds}-fold CV...")
+
+    ranked, rounds = successive_halving(cache, candidates, args.factor, args.min_samples)
+
+    print("\n🏆 TOP CANDIDATES")
+    print("="*35)
+    for c in ranked[:5]:
+        print(f"{c['score']:.4f}  {c['classifier']} {c['params']}  {c['vectorizer']}")
+
+    print(f"\nTokenizing took {cache.tokenize_seconds:.1f}s for {len(cache._counts)} (fold, ngram_range) pairs")
+
+    with open(args.output, "w") as f:
+        json.dump({"best": ranked[0], "ranked": ranked, "rounds": rounds}, f, indent=2, default=list)
+
+    print(f"✅ Search results saved to {args.output}")
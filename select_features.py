@@ -0,0 +1,138 @@
+# Supervised feature selection between features.py and train_models.py.
+#
+#   python select_features.py                      # report only
+#   python select_features.py --method l1 --keep 2000
+#   python train_models.py --features models/reduced
+#
+# Ranks the TF-IDF columns by chi² (or by the weights of an L1-regularized
+# linear SVM), then for each candidate size retrains the deployed
+# Logistic Regression on the reduced matrix and reports accuracy, model
+# size and serving latency. --keep K writes the K-feature vectorizer and
+# feature matrix to REDUCED_DIR, leaving the served ones alone (the
+# deployed models still expect every column). train_models.py --features
+# REDUCED_DIR trains on them and installs the vectorizer with the models.
+import argparse
+import json
+import os
+import pickle
+import time
+import joblib
+import numpy as np
+from sklearn.feature_selection import chi2
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import normalize
+from sklearn.svm import LinearSVC
+from moderation import ml_scores
+from benchmarks.corpus import synthetic_comments
+from cleaning import clean_text
+
+REPORT_PATH = "models/feature_selection_report.json"
+REDUCED_DIR = "models/reduced"
+SIZES = [500, 1000, 2000, 5000, 10000]
+
+
+# ---------------- RANKING ----------------
+def rank_features(X_train, y_train, method):
+    if method == "chi2":
+        scores, _ = chi2(X_train, y_train)
+        scores = np.nan_to_num(scores)
+    else:
+        l1 = LinearSVC(penalty="l1", dual=False, C=0.5, class_weight="balanced")
+        l1.fit(X_train, y_train)
+        scores = np.abs(l1.coef_).max(axis=0)
+
+    return np.argsort(-scores, kind="stable")
+
+
+# ---------------- REDUCE ----------------
+def reduce_vectorizer(vectorizer, keep):
+    keep = np.sort(keep)
+    terms = {col: term for term, col in vectorizer.vocabulary_.items()}
+
+    # same settings with a fixed vocabulary; idf_ goes through the public setter
+    reduced = type(vectorizer)(**{
+        **vectorizer.get_params(),
+        "vocabulary": {terms[col]: i for i, col in enumerate(keep)},
+    })
+    reduced.idf_ = vectorizer.idf_[keep]
+
+    return reduced
+
+
+def reduce_matrix(X, keep):
+    # restricting columns then re-normalizing each row gives exactly what
+    # the reduced vectorizer produces (the l2 norm is taken after idf)
+    return normalize(X[:, np.sort(keep)], norm="l2")
+
+
+def serving_latency(model, vectorizer, texts):
+    start = time.perf_counter()
+    for t in texts:
+        ml_scores(model, vectorizer.transform([t]))
+    return (time.perf_counter() - start) / len(texts) * 1000
+
+
+def model_bytes(model, vectorizer):
+    return len(pickle.dumps(model)) + len(pickle.dumps(vectorizer))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--method", choices=["chi2", "l1"], default="chi2")
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)))
+    parser.add_argument("--keep", type=int, default=None, help="write the K-feature vectorizer and matrix")
+    parser.add_argument("--report", default=REPORT_PATH)
+    args = parser.parse_args()
+
+    print("\n🔄 Loading features...")
+
+    X = joblib.load("models/X_features.pkl")
+    y = joblib.load("models/y_labels.pkl")
+    vectorizer = joblib.load("models/tfidf_vectorizer.pkl")
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y,
+        test_size=0.2,
+        random_state=42,
+        stratify=y
+    )
+
+    order = rank_features(X_train, y_train, args.method)
+    sizes = sorted({min(int(k), X.shape[1]) for k in args.sizes.split(",")} | {X.shape[1]})
+    latency_texts = [clean_text(t) for t in synthetic_comments(300)]
+
+    print(f"Ranked {X.shape[1]} features by {args.method}")
+    print(f"\n{'features':>9} {'accuracy':>9} {'size KB':>9} {'ms/comment':>11}")
+
+    rows = []
+    for k in sizes:
+        keep = order[:k]
+        model = LogisticRegression(max_iter=2000, class_weight='balanced')
+        model.fit(reduce_matrix(X_train, keep), y_train)
+
+        reduced = reduce_vectorizer(vectorizer, keep)
+        row = {
+            "features": k,
+            "accuracy": accuracy_score(y_test, model.predict(reduce_matrix(X_test, keep))),
+            "model_kb": model_bytes(model, reduced) / 1024,
+            "ms_per_comment": serving_latency(model, reduced, latency_texts),
+        }
+        rows.append(row)
+        print(f"{k:>9} {row['accuracy']:>9.4f} {row['model_kb']:>9.0f} {row['ms_per_comment']:>11.3f}")
+
+    with open(args.report, "w") as f:
+        json.dump({"method": args.method, "results": rows}, f, indent=2)
+
+    print(f"\n✅ Report saved to {args.report}")
+
+    if args.keep:
+        keep = order[:args.keep]
+        reduced = reduce_vectorizer(vectorizer, keep)
+        os.makedirs(REDUCED_DIR, exist_ok=True)
+        joblib.dump(reduced, os.path.join(REDUCED_DIR, "tfidf_vectorizer.pkl"))
+        joblib.dump(reduce_matrix(X, keep), os.path.join(REDUCED_DIR, "X_features.pkl"))
+
+        print(f"✅ {len(keep)}-column vectorizer and features written to {REDUCED_DIR}/ — "
+              f"run train_models.py --features {REDUCED_DIR} to train on them")
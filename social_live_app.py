@@ -1,30 +1,12 @@
 import streamlit as st
-import joblib
-import re
-import emoji
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
+import uuid
+from model_registry import get_engine
+from chat_history import ChatHistory
 
 # -----------------------------
 # Load ML Model
 # -----------------------------
-model = joblib.load("models/Logistic_Regression.pkl")
-vectorizer = joblib.load("models/tfidf_vectorizer.pkl")
-
-# -----------------------------
-# Text cleaning
-# -----------------------------
-stop_words = set(stopwords.words('english'))
-lemmatizer = WordNetLemmatizer()
-
-def clean_text(text):
-    text = text.lower()
-    text = re.sub(r'http\S+|www\S+', '', text)
-    text = emoji.replace_emoji(text, replace='')
-    text = re.sub(r'[^a-z\s]', '', text)
-    words = text.split()
-    words = [lemmatizer.lemmatize(w) for w in words if w not in stop_words]
-    return " ".join(words)
+engine = get_engine("models/Logistic_Regression.pkl", sentiment=False)
 
 # -----------------------------
 # PAGE SETTINGS
@@ -94,11 +76,11 @@ st.markdown(
 # -----------------------------
 # Session state
 # -----------------------------
+# bounded window of comments, older ones spill to disk
 if "comments" not in st.session_state:
-    st.session_state.comments = [
-        {"text": "Welcome to the stream!", "likes": 2},
-        {"text": "Amazing content 🔥", "likes": 4}
-    ]
+    st.session_state.comments = ChatHistory(channel=uuid.uuid4().hex)
+    st.session_state.comments.append("viewer", "Welcome to the stream!", likes=2)
+    st.session_state.comments.append("viewer", "Amazing content 🔥", likes=4)
 
 if "likes" not in st.session_state:
     st.session_state.likes = 0
@@ -129,7 +111,7 @@ with video_col:
 with chat_col:
     st.subheader("💬 Live Chat")
 
-    for idx, comment in enumerate(st.session_state.comments):
+    for comment in st.session_state.comments.visible:
         st.markdown(f"""
         <div class="chat-box">
         {comment["text"]}<br>
@@ -137,8 +119,9 @@ with chat_col:
         </div>
         """, unsafe_allow_html=True)
 
-        if st.button("❤️ Like", key=f"comment_like_{idx}"):
-            comment["likes"] += 1
+        if st.button("❤️ Like", key=f"comment_like_{comment['seq']}"):
+            # through the history, so likes on spilled comments are kept too
+            st.session_state.comments.update(comment["seq"], likes=comment["likes"] + 1)
             st.rerun()
 
 # -----------------------------
@@ -155,16 +138,11 @@ with send_col:
         if comment_input.strip() == "":
             st.warning("Comment cannot be empty")
         else:
-            cleaned = clean_text(comment_input)
-            vec = vectorizer.transform([cleaned])
-            prediction = model.predict(vec)[0]
-
-            if prediction == 1:
+            # the engine's score is one class's probability here: block on the label
+            if engine.harmful(comment_input):
                 st.error("⚠️ Comment blocked: harmful content detected")
             else:
-                st.session_state.comments.append(
-                    {"text": comment_input, "likes": 0}
-                )
+                st.session_state.comments.append("You", comment_input, likes=0)
                 st.success("✅ Comment posted")
                 st.rerun()
 
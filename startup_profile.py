@@ -0,0 +1,150 @@
+# Cold-start profiler for the live apps.
+#
+#   python startup_profile.py                                  # ultimate_social_live.py
+#   python startup_profile.py --script app.py --budget-ms 800 --ready-budget-ms 4000
+#
+# Starts a fresh interpreter with `-X importtime`, imports everything the
+# app script imports at top level (what runs before the page can draw),
+# then times each deferred load step (nltk, VADER, moderation engine).
+# Reports cumulative time per top-level import, the packages with the
+# most import time, and each load step. Exits with status 1 when first
+# paint or full readiness goes over budget, so CI and tests can call it.
+import argparse
+import ast
+import json
+import subprocess
+import sys
+from collections import Counter
+
+FIRST_PAINT_BUDGET_MS = 1000
+READY_BUDGET_MS = None
+
+# deferred work, in the order an app session triggers it
+LOAD_STEPS = {
+    "nltk tools": "from cleaning import nltk_tools; nltk_tools()",
+    "sentiment model": "from model_registry import registry; registry.sentiment_ai()",
+    "moderation engine": "from model_registry import get_engine; get_engine()",
+}
+
+CHILD = """
+import json, sys, time
+modules, steps = json.loads(sys.argv[1]), json.loads(sys.argv[2])
+start = time.perf_counter()
+for name in modules:
+    __import__(name)
+timings = {"imports": time.perf_counter() - start, "steps": {}}
+for name, code in steps.items():
+    t = time.perf_counter()
+    exec(code, {})
+    timings["steps"][name] = time.perf_counter() - t
+print(json.dumps(timings))
+"""
+
+
+# ---------------- IMPORTS ----------------
+def top_level_imports(script):
+    # only module-level statements: imports inside functions or branches
+    # are already deferred
+    with open(script) as f:
+        tree = ast.parse(f.read(), script)
+
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules += [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module != "__future__":
+            modules.append(node.module)
+
+    return list(dict.fromkeys(modules))
+
+
+def parse_importtime(stderr):
+    # "import time: self [us] | cumulative | <indent>package"
+    top, packages = {}, Counter()
+
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        name = name.strip()
+
+        packages[name.split(".")[0]] += int(self_us)
+        if depth == 0:
+            top[name] = int(cumulative_us) / 1000
+
+    return top, {name: us / 1000 for name, us in packages.most_common()}
+
+
+# ---------------- PROFILE ----------------
+def profile(script, steps=LOAD_STEPS):
+    modules = top_level_imports(script)
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD, json.dumps(modules), json.dumps(steps)],
+        capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"profiling {script} failed:\n{result.stderr[-2000:]}")
+
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    top, packages = parse_importtime(result.stderr)
+
+    first_paint = timings["imports"] * 1000
+    steps_ms = {name: s * 1000 for name, s in timings["steps"].items()}
+
+    return {
+        "script": script,
+        "first_paint_ms": first_paint,
+        "ready_ms": first_paint + sum(steps_ms.values()),
+        "imports_ms": {m: top.get(m, 0.0) for m in modules},
+        "steps_ms": steps_ms,
+        # every import done by the child, including the load steps
+        "packages_ms": packages,
+    }
+
+
+def check_budget(report, first_paint_ms=FIRST_PAINT_BUDGET_MS, ready_ms=READY_BUDGET_MS):
+    failures = []
+    if first_paint_ms is not None and report["first_paint_ms"] > first_paint_ms:
+        failures.append(f"first paint {report['first_paint_ms']:.0f}ms > {first_paint_ms:.0f}ms")
+    if ready_ms is not None and report["ready_ms"] > ready_ms:
+        failures.append(f"ready {report['ready_ms']:.0f}ms > {ready_ms:.0f}ms")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--script", default="ultimate_social_live.py")
+    parser.add_argument("--budget-ms", type=float, default=FIRST_PAINT_BUDGET_MS, help="max time before the page can draw")
+    parser.add_argument("--ready-budget-ms", type=float, default=READY_BUDGET_MS, help="max time until the first comment can be scored")
+    parser.add_argument("--top", type=int, default=10, help="packages to list")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    report = profile(args.script)
+
+    print(f"\n⏱️ Cold start of {args.script}")
+    print("\nTop-level imports (before first paint):")
+    for name, ms in sorted(report["imports_ms"].items(), key=lambda kv: -kv[1]):
+        print(f"  {name:<28} {ms:>8.1f}ms")
+
+    print("\nDeferred load steps:")
+    for name, ms in report["steps_ms"].items():
+        print(f"  {name:<28} {ms:>8.1f}ms")
+
+    print("\nHeaviest packages (self import time, all steps):")
+    for name, ms in list(report["packages_ms"].items())[:args.top]:
+        print(f"  {name:<28} {ms:>8.1f}ms")
+
+    print(f"\nFirst paint: {report['first_paint_ms']:.0f}ms   Ready: {report['ready_ms']:.0f}ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    failures = check_budget(report, args.budget_ms, args.ready_budget_ms)
+    if failures:
+        print("❌ Over budget: " + "; ".join(failures))
+        sys.exit(1)
+    print("✅ Within budget")
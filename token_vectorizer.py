@@ -0,0 +1,42 @@
+# TF-IDF vectorizer that takes token lists from cleaning.tokenize().
+#
+# With the default word analyzer, TokenTfidfVectorizer accepts either
+# strings (tokenized with the usual regex, as in training on the cleaned
+# CSV) or token lists straight from tokenize() (serving), and builds the
+# n-grams of both with cleaning.word_ngrams. A token list gives the same
+# features as a plain TfidfVectorizer on the joined cleaned string. All
+# constructor parameters are the usual ones, so fast_model.py and
+# linear_scorer.py read it like any TfidfVectorizer.
+import re
+from sklearn.feature_extraction.text import TfidfVectorizer
+from cleaning import word_ngrams, TOKEN_PATTERN
+
+
+class TokenTfidfVectorizer(TfidfVectorizer):
+
+    @property
+    def accepts_tokens(self):
+        # True if transform() can be given tokenize() output instead of strings
+        return (
+            self.analyzer == "word"
+            and self.token_pattern == TOKEN_PATTERN
+            and self.tokenizer is None
+            and self.preprocessor is None
+            and self.stop_words is None
+            and self.strip_accents is None
+        )
+
+    def build_analyzer(self):
+        if not self.accepts_tokens:
+            return super().build_analyzer()
+
+        token_re = re.compile(self.token_pattern)
+        lowercase = self.lowercase
+        ngram_range = self.ngram_range
+
+        def analyze(doc):
+            if isinstance(doc, str):
+                doc = token_re.findall(doc.lower() if lowercase else doc)
+            return word_ngrams(doc, ngram_range)
+
+        return analyze
@@ -1,85 +1,254 @@
+import argparse
+import os
+import shutil
+import time
 import joblib
+import numpy as np
+from joblib import Parallel, delayed
+from threadpoolctl import threadpool_limits
 from sklearn.linear_model import LogisticRegression
 from sklearn.svm import LinearSVC
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.neural_network import MLPClassifier
 from sklearn.metrics import accuracy_score, classification_report
 from sklearn.model_selection import train_test_split
+from fast_model import export_fast_model, load_fast_model, export_vectorizer, FAST_MODEL_DIR, SLIM_VECTORIZER_DIR
+from compact import quantization_report, print_quantization
+from cascade import CascadeModel
+from moderation import ml_scores, same_path, VECTORIZER_PATH
 
-print("\n🔄 Loading features...")
+CASCADE_PATH = "models/cascade_model.pkl"
+SPLIT_PATH = "models/split_indices.npz"
 
-# ---------------- LOAD DATA ----------------
-X = joblib.load("models/X_features.pkl")
-y = joblib.load("models/y_labels.pkl")
+# ---------------- MODELS ----------------
+# "threads" says how a model can use more than one core:
+#   None  -> single-threaded fit (liblinear / lbfgs)
+#   "n_jobs" -> joblib threads inside the estimator
+#   "blas" -> numpy/BLAS threads (dense matmuls in the MLP)
+# "weight" is the relative share of spare cores a parallel job receives.
+MODELS = {
+    "Logistic Regression": {
+        "model": lambda: LogisticRegression(
+            max_iter=2000,
+            class_weight='balanced',
+            n_jobs=-1
+        ),
+        "threads": None,
+        "weight": 1,
+    },
+
+    "Linear SVM": {
+        "model": lambda: LinearSVC(
+            class_weight='balanced'
+        ),
+        "threads": None,
+        "weight": 1,
+    },
+
+    "Random Forest": {
+        "model": lambda: RandomForestClassifier(
+            n_estimators=200,
+            n_jobs=-1
+        ),
+        "threads": "n_jobs",
+        "weight": 3,
+    },
+
+    "Neural Network": {
+        "model": lambda: MLPClassifier(
+            hidden_layer_sizes=(100,),
+            max_iter=15
+        ),
+        "threads": "blas",
+        "weight": 1,
+    },
+}
 
-print("Feature shape:", X.shape)
 
-# ---------------- SPLIT ----------------
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y,
-    test_size=0.2,
-    random_state=42,
-    stratify=y
-)
+# ---------------- SCHEDULER ----------------
+# Single-threaded jobs get one core each; the remaining cores are split
+# between the multi-threaded jobs by weight, so the whole run keeps every
+# core busy instead of training one model after another.
+def allocate_threads(specs, n_cpus):
+    threads = {name: 1 for name in specs}
+    parallel = [name for name, spec in specs.items() if spec["threads"]]
+    spare = max(0, n_cpus - len(specs))
 
-print("✅ Data split complete")
+    if parallel and spare:
+        total = sum(specs[name]["weight"] for name in parallel)
+        for name in parallel:
+            threads[name] += spare * specs[name]["weight"] // total
 
-# ---------------- MODELS ----------------
-models = {
-    "Logistic Regression": LogisticRegression(
-        max_iter=2000,
-        class_weight='balanced',
-        n_jobs=-1
-    ),
-
-    "Linear SVM": LinearSVC(
-        class_weight='balanced'
-    ),
-
-    "Random Forest": RandomForestClassifier(
-        n_estimators=200,
-        n_jobs=-1
-    ),
-
-    "Neural Network": MLPClassifier(
-        hidden_layer_sizes=(100,),
-        max_iter=15
+        # hand out rounding leftovers to the heaviest jobs first
+        leftover = n_cpus - sum(threads.values())
+        for name in sorted(parallel, key=lambda n: -specs[n]["weight"])[:max(0, leftover)]:
+            threads[name] += 1
+
+    return threads
+
+
+def train_one(name, spec, n_threads, X_train, y_train, X_test, y_test):
+    model = spec["model"]()
+    if spec["threads"] == "n_jobs":
+        model.set_params(n_jobs=n_threads)
+
+    start = time.perf_counter()
+    with threadpool_limits(limits=n_threads):
+        model.fit(X_train, y_train)
+        pred = model.predict(X_test)
+    seconds = time.perf_counter() - start
+
+    return name, model, accuracy_score(y_test, pred), classification_report(y_test, pred), seconds
+
+
+def train_all(X_train, y_train, X_test, y_test, n_cpus):
+    threads = allocate_threads(MODELS, n_cpus)
+
+    # heaviest jobs first so they are never queued behind quick ones;
+    # loky workers memory-map the feature matrix instead of copying it
+    order = sorted(MODELS, key=lambda n: -threads[n])
+    return Parallel(n_jobs=min(len(MODELS), n_cpus), backend="loky", max_nbytes="1M", mmap_mode="r")(
+        delayed(train_one)(name, MODELS[name], threads[name], X_train, y_train, X_test, y_test)
+        for name in order
+    ), threads
+
+
+def save_model(model, path):
+    # write + rename, so running apps that watch best_model.pkl never
+    # load a half-written file
+    joblib.dump(model, path + ".tmp")
+    os.replace(path + ".tmp", path)
+
+
+def split_indices(y):
+    return train_test_split(
+        np.arange(len(y)),
+        test_size=0.2,
+        random_state=42,
+        stratify=y
     )
-}
 
-results = {}
 
-# ---------------- TRAIN & EVALUATE ----------------
-for name, model in models.items():
-    print(f"\n🚀 Training {name}...")
+def save_split(train_idx, test_idx, path=SPLIT_PATH):
+    # row indices into X_features.pkl, so evaluate_model.py scores exactly
+    # the rows the models never saw
+    with open(path + ".tmp", "wb") as f:
+        np.savez(f, train=train_idx, test=test_idx)
+    os.replace(path + ".tmp", path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n-cpus", type=int, default=os.cpu_count(), help="cores shared by all models")
+    parser.add_argument("--cascade", action="store_true", help=f"also save a linear -> heavy cascade to {CASCADE_PATH}")
+    parser.add_argument("--quantize", action="store_true", help="store the fast artifact's weights as int8")
+    parser.add_argument("--features", default="models",
+                        help="directory with X_features.pkl (e.g. select_features.py --keep output); "
+                             "its vectorizer is installed with the models")
+    args = parser.parse_args()
+
+    print("\n🔄 Loading features...")
+
+    # ---------------- LOAD DATA ----------------
+    X = joblib.load(os.path.join(args.features, "X_features.pkl"))
+    y = joblib.load("models/y_labels.pkl")
+
+    print("Feature shape:", X.shape)
+
+    # ---------------- SPLIT ----------------
+    train_idx, test_idx = split_indices(y)
+    X_train, X_test = X[train_idx], X[test_idx]
+    y_train, y_test = y.iloc[train_idx], y.iloc[test_idx]
+    save_split(train_idx, test_idx)
+
+    print(f"✅ Data split complete (indices saved to {SPLIT_PATH})")
+
+    # ---------------- TRAIN & EVALUATE ----------------
+    print(f"\n🚀 Training {len(MODELS)} models concurrently on {args.n_cpus} cores...")
+
+    finished, threads = train_all(X_train, y_train, X_test, y_test, args.n_cpus)
+
+    results = {}
+    trained = {}
+
+    for name, model, acc, report, seconds in sorted(finished, key=lambda r: list(MODELS).index(r[0])):
+        results[name] = acc
+        trained[name] = model
+
+        print(f"\n✅ {name} Accuracy: {acc:.4f} ({seconds:.1f}s, {threads[name]} threads)")
+        print(report)
+
+        # save model
+        save_model(model, f"models/{name.replace(' ','_')}.pkl")
+
+    # ---------------- BEST MODEL ----------------
+    best_model = max(results, key=results.get)
+
+    print("\n🏆 MODEL COMPARISON")
+    print("="*35)
+
+    for name, acc in results.items():
+        print(f"{name}: {acc:.4f}")
+
+    print("\n🥇 Best Model:", best_model)
+
+    # Save best model as default, straight from memory
+    save_model(trained[best_model], "models/best_model.pkl")
+
+    print("\n✅ Best model saved as models/best_model.pkl")
+
+    # ---------------- INSTALL FEATURES ----------------
+    # features from another directory have other columns: their vectorizer
+    # and matrix replace the served ones right after the models that expect them
+    if not same_path(args.features, "models"):
+        vectorizer = joblib.load(os.path.join(args.features, "tfidf_vectorizer.pkl"))
+        save_model(vectorizer, VECTORIZER_PATH)
+        export_vectorizer(vectorizer, SLIM_VECTORIZER_DIR)
+        save_model(X, "models/X_features.pkl")
 
-    model.fit(X_train, y_train)
-    pred = model.predict(X_test)
+        print(f"✅ Installed the {X.shape[1]}-column vectorizer and features from {args.features}")
 
-    acc = accuracy_score(y_test, pred)
-    results[name] = acc
+    # ---------------- FAST ARTIFACT ----------------
+    # flat, memory-mappable copy of the winner for quick cold starts
+    try:
+        vectorizer = joblib.load("models/tfidf_vectorizer.pkl")
+        export_fast_model(trained[best_model], vectorizer, FAST_MODEL_DIR, quantize=args.quantize,
+                          source="models/best_model.pkl")
 
-    print(f"✅ {name} Accuracy: {acc:.4f}")
-    print(classification_report(y_test, pred))
+        fast_model, _ = load_fast_model(FAST_MODEL_DIR)
+        drift = abs(fast_model.decision_function(X_test) - trained[best_model].decision_function(X_test)).max()
 
-    # save model
-    joblib.dump(model, f"models/{name.replace(' ','_')}.pkl")
+        print(f"✅ Memory-mapped model exported to {FAST_MODEL_DIR} (max decision drift {drift:.2e})")
+        if args.quantize:
+            # serving decides on probabilities against the cutoffs, not the argmax
+            print_quantization(quantization_report(trained[best_model], fast_model, X_test, y_test))
+    except ValueError as e:
+        # an older export is of another model: remove it so it is never served
+        shutil.rmtree(FAST_MODEL_DIR, ignore_errors=True)
+        print(f"\n⚠️ Skipping memory-mapped export (removed {FAST_MODEL_DIR}): {e}")
 
-# ---------------- BEST MODEL ----------------
-best_model = max(results, key=results.get)
+    # ---------------- CASCADE ----------------
+    # Logistic Regression decides confident comments, the most accurate
+    # heavy model only sees the uncertain band around the warn cutoffs
+    if args.cascade:
+        heavy = max(["Random Forest", "Neural Network"], key=results.get)
+        cascade = CascadeModel(trained["Logistic Regression"], trained[heavy])
 
-print("\n🏆 MODEL COMPARISON")
-print("="*35)
+        start = time.perf_counter()
+        ml_scores(trained[heavy], X_test)
+        heavy_seconds = time.perf_counter() - start
 
-for name, acc in results.items():
-    print(f"{name}: {acc:.4f}")
+        start = time.perf_counter()
+        cascade.ml_scores(X_test)
+        cascade_seconds = time.perf_counter() - start
 
-print("\n🥇 Best Model:", best_model)
+        stats = cascade.stats()
+        cascade.reset_stats()
 
-# Save best model as default
-joblib.dump(
-    joblib.load(f"models/{best_model.replace(' ','_')}.pkl"),
-    "models/best_model.pkl"
-)
+        print(f"\n🪜 Cascade: Logistic Regression → {heavy}")
+        print(f"Fast tier only: {stats['fast_only']} / {stats['comments']} comments ({1 - stats['heavy_rate']:.1%})")
+        print(f"Scoring time: {cascade_seconds * 1000:.1f}ms vs {heavy_seconds * 1000:.1f}ms for {heavy} alone")
+        print(f"Cascade accuracy: {accuracy_score(y_test, cascade.predict(X_test)):.4f}")
 
-print("\n✅ Best model saved as models/best_model.pkl")
\ No newline at end of file
+        save_model(cascade, CASCADE_PATH)
+        print(f"✅ Cascade saved as {CASCADE_PATH} (serve it with MODERATION_MODEL={CASCADE_PATH})")
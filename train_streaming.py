@@ -0,0 +1,194 @@
+# Out-of-core training for corpora that do not fit in memory.
+#
+#   python train_streaming.py --chunksize 100000 --epochs 2
+#   python train_streaming.py --resume
+#
+# The cleaned CSV is streamed in chunks. A HashingVectorizer needs no
+# fitted vocabulary, so every chunk is featurized on its own, and SGD
+# linear classifiers learn from it with partial_fit. Only one chunk is
+# ever held in memory. A first pass reads the label column alone to find
+# the classes and their counts ('balanced' weighting needs them up front).
+#
+# Every fifth row (by position in the file) is held out and never
+# trained on. Each chunk's held-out rows are scored before the models
+# learn from that chunk (progressive accuracy, logged as training runs),
+# and a final streaming pass scores the whole hold-out. A checkpoint with
+# the models and the position in the file is written every few chunks or
+# minutes (the SGD weights are ~100MB), so an interrupted run continues
+# with --resume and redoes at most the chunks since the last checkpoint.
+import argparse
+import os
+import resource
+import time
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+from features import CLEAN_PATH, VECTORIZER_PARAMS, detect_columns
+from train_models import save_model
+
+CHECKPOINT_PATH = "models/streaming_checkpoint.pkl"
+MODEL_PATH = "models/streaming_model.pkl"
+VECTORIZER_PATH = "models/hashing_vectorizer.pkl"
+HOLDOUT_EVERY = 5
+CHECKPOINT_EVERY_CHUNKS = 10
+CHECKPOINT_EVERY_SECONDS = 300
+
+# same n-grams as the TF-IDF features; 2^20 hashed columns keep
+# collisions rare at ~15k useful n-grams while using no vocabulary memory
+HASHING_PARAMS = {
+    "ngram_range": VECTORIZER_PARAMS["ngram_range"],
+    "n_features": 2 ** 20,
+    "alternate_sign": False,
+    "norm": "l2",
+}
+
+MODELS = {
+    # log loss -> predict_proba, so it serves like Logistic Regression
+    "SGD Logistic": lambda: SGDClassifier(loss="log_loss", alpha=1e-6, random_state=42),
+    "SGD Linear SVM": lambda: SGDClassifier(loss="hinge", alpha=1e-6, random_state=42),
+}
+
+
+# ---------------- STREAM ----------------
+def read_chunks(path, chunksize, skip_rows=0):
+    # already-trained rows are read a chunk at a time and discarded; a
+    # skiprows list would make pandas hold a set of every skipped row
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        if skip_rows >= len(chunk):
+            skip_rows -= len(chunk)
+            continue
+        if skip_rows:
+            chunk = chunk.iloc[skip_rows:]
+            skip_rows = 0
+        yield chunk
+
+
+def label_counts(path, label_col, chunksize):
+    counts = pd.Series(dtype="int64")
+    for chunk in pd.read_csv(path, usecols=[label_col], chunksize=chunksize):
+        counts = counts.add(chunk[label_col].value_counts(), fill_value=0)
+    return counts.astype("int64").sort_index()
+
+
+def class_weights(counts):
+    # same formula as class_weight='balanced'
+    return {label: counts.sum() / (len(counts) * n) for label, n in counts.items()}
+
+
+# ---------------- CHECKPOINT ----------------
+def new_state(classes, weights):
+    return {
+        "models": {name: make() for name, make in MODELS.items()},
+        "classes": classes,
+        "weights": weights,
+        "epoch": 0,
+        "rows_done": 0,
+        "chunks": 0,
+    }
+
+
+def save_checkpoint(state, path=CHECKPOINT_PATH):
+    joblib.dump(state, path + ".tmp")
+    os.replace(path + ".tmp", path)
+
+
+def held_out_rows(first_row, n):
+    return (first_row + np.arange(n)) % HOLDOUT_EVERY == 0
+
+
+def peak_rss_mb():
+    # ru_maxrss is KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", default=CLEAN_PATH)
+    parser.add_argument("--chunksize", type=int, default=100000)
+    parser.add_argument("--epochs", type=int, default=1)
+    parser.add_argument("--resume", action="store_true", help=f"continue from {CHECKPOINT_PATH}")
+    parser.add_argument("--checkpoint-every", type=int, default=CHECKPOINT_EVERY_CHUNKS, help="chunks between checkpoints")
+    parser.add_argument("--checkpoint-seconds", type=float, default=CHECKPOINT_EVERY_SECONDS, help="max seconds between checkpoints")
+    args = parser.parse_args()
+
+    text_col, label_col = detect_columns(pd.read_csv(args.input, nrows=1))
+    vectorizer = HashingVectorizer(**HASHING_PARAMS)
+
+    if args.resume and os.path.exists(CHECKPOINT_PATH):
+        state = joblib.load(CHECKPOINT_PATH)
+        print(f"🔁 Resuming at epoch {state['epoch'] + 1}, row {state['rows_done']}")
+    else:
+        print("\n🔄 Counting labels...")
+        counts = label_counts(args.input, label_col, args.chunksize)
+        state = new_state(counts.index.to_numpy(), class_weights(counts))
+        print(f"{counts.sum()} rows, {len(counts)} classes")
+
+    print(f"\n🚀 Streaming {args.input} in chunks of {args.chunksize} rows...")
+    start = time.perf_counter()
+    last_checkpoint, unsaved = start, 0
+
+    while state["epoch"] < args.epochs:
+        for chunk in read_chunks(args.input, args.chunksize, state["rows_done"]):
+            X = vectorizer.transform(chunk[text_col].fillna("").astype(str))
+            y = chunk[label_col].to_numpy()
+
+            held_out = held_out_rows(state["rows_done"], len(chunk))
+            train = ~held_out
+            weights = np.array([state["weights"][label] for label in y[train]])
+
+            progressive = {}
+            for name, model in state["models"].items():
+                if held_out.any() and hasattr(model, "coef_"):
+                    progressive[name] = (model.predict(X[held_out]) == y[held_out]).mean()
+                model.partial_fit(X[train], y[train], classes=state["classes"], sample_weight=weights)
+
+            state["rows_done"] += len(chunk)
+            state["chunks"] += 1
+            unsaved += 1
+            if unsaved >= args.checkpoint_every or time.perf_counter() - last_checkpoint >= args.checkpoint_seconds:
+                save_checkpoint(state)
+                last_checkpoint, unsaved = time.perf_counter(), 0
+
+            print(f"  epoch {state['epoch'] + 1} chunk {state['chunks']}: {state['rows_done']} rows, "
+                  f"{time.perf_counter() - start:.1f}s, peak RSS {peak_rss_mb():.0f}MB"
+                  + "".join(f", {n} {a:.4f}" for n, a in progressive.items()))
+
+        state["epoch"] += 1
+        state["rows_done"] = 0
+        state["chunks"] = 0
+        save_checkpoint(state)
+        last_checkpoint, unsaved = time.perf_counter(), 0
+
+    # ---------------- FINAL HOLD-OUT ----------------
+    # one last bounded pass so every model is scored on the full hold-out
+    # with its final weights
+    results = {name: [0, 0] for name in MODELS}
+    first_row = 0
+    for chunk in read_chunks(args.input, args.chunksize):
+        held_out = held_out_rows(first_row, len(chunk))
+        first_row += len(chunk)
+        if not held_out.any():
+            continue
+
+        X = vectorizer.transform(chunk[text_col].fillna("").astype(str)[held_out])
+        y = chunk[label_col].to_numpy()[held_out]
+        for name, model in state["models"].items():
+            results[name][0] += int((model.predict(X) == y).sum())
+            results[name][1] += len(y)
+
+    print("\n🏆 HOLD-OUT ACCURACY")
+    print("="*35)
+    accuracy = {name: c / t if t else 0.0 for name, (c, t) in results.items()}
+    for name, acc in accuracy.items():
+        print(f"{name}: {acc:.4f}")
+
+    best = max(accuracy, key=accuracy.get)
+    save_model(state["models"][best], MODEL_PATH)
+    joblib.dump(vectorizer, VECTORIZER_PATH)
+
+    print(f"\n🥇 Best model: {best}")
+    print(f"✅ Saved {MODEL_PATH} + {VECTORIZER_PATH} "
+          f"(serve with moderation_server.py --model {MODEL_PATH} --vectorizer {VECTORIZER_PATH})")
+    print(f"Peak RSS: {peak_rss_mb():.0f}MB")
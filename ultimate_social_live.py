@@ -1,23 +1,24 @@
 import streamlit as st
-import joblib
-import re
-import emoji
+import uuid
+from collections import deque
 from datetime import datetime
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
-from streamlit_webrtc import webrtc_streamer
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+from model_registry import get_engine, preload_engine
+from chat_history import ChatHistory
+from moderation_log import get_log
+from user_limits import get_limits
 import random
-import math
+import re
 
 # ---------------- LOAD MODELS ----------------
-model = joblib.load("models/best_model.pkl")
-vectorizer = joblib.load("models/tfidf_vectorizer.pkl")
+# the moderation engine is loaded in the background once the page has
+# drawn (see the end of this script) and fetched with get_engine() where
+# a comment is scored; `python startup_profile.py` measures cold start
 
-sentiment_ai = SentimentIntensityAnalyzer()
+# every Send decision, blocked ones included, goes to the audit log
+moderation_log = get_log()
 
-stop_words = set(stopwords.words('english'))
-lemmatizer = WordNetLemmatizer()
+# per-user offense decay and rate limits, checked before the model runs
+limits = get_limits()
 
 # ---------------- USERS ----------------
 users = {
@@ -26,42 +27,16 @@ users = {
     "Priya": {"avatar": "https://i.pravatar.cc/40?img=5", "verified": False},
 }
 
-# ---------------- TEXT CLEAN ----------------
-def clean_text(text):
-    text = text.lower()
-    text = re.sub(r'http\S+|www\S+', '', text)
-    text = emoji.replace_emoji(text, replace='')
-    text = re.sub(r'[^a-z\s]', '', text)
-    words = text.split()
-    words = [lemmatizer.lemmatize(w) for w in words if w not in stop_words]
-    return " ".join(words)
-
-# ---------------- TOXICITY SCORE ----------------
-def toxicity_score(text):
-    vec = vectorizer.transform([text])
-
-    if hasattr(model, "predict_proba"):
-        ml_score = model.predict_proba(vec).ravel()[1]
-    elif hasattr(model, "decision_function"):
-        s = model.decision_function(vec).ravel()[0]
-        ml_score = 1 / (1 + math.exp(-s))
-    else:
-        ml_score = model.predict(vec).ravel()[0]
-
-    sentiment_score = sentiment_ai.polarity_scores(text)["compound"]
-    aggression_boost = abs(sentiment_score) * 0.25 if sentiment_score < 0 else 0
-
-    return max(0, min(1, ml_score + aggression_boost))
-
-# ---------------- SENTIMENT ----------------
-def sentiment(text):
-    score = sentiment_ai.polarity_scores(text)["compound"]
-    if score >= 0.05:
-        return "🙂 Positive"
-    elif score <= -0.05:
-        return "😠 Negative"
-    else:
-        return "😐 Neutral"
+# ---------------- CHAT CARD ----------------
+# rendered once per message when it is added to the history
+def render_comment(c):
+    user = users[c["user"]]
+    return (
+        f'<div class="chat-card {c["css"]}">'
+        f'<img src="{user["avatar"]}" width="40" style="border-radius:50%">'
+        f'<div><b>{c["user"]}</b> • {c["time"]}<br>{c["text"]}</div>'
+        f'</div>'
+    )
 
 # ---------------- PAGE CONFIG ----------------
 st.set_page_config(layout="wide")
@@ -155,21 +130,29 @@ else:
     st.info("Stream offline")
 
 # ---------------- SESSION STATE ----------------
+# comments: bounded visible window, older messages spill to SQLite
+# floating: only the last few reactions are ever drawn
+if "comments" not in st.session_state:
+    st.session_state.comments = ChatHistory(channel=uuid.uuid4().hex, render=render_comment)
+
 for key, default in {
-    "comments": [],
-    "floating": [],
-    "warnings": 0,
+    "floating": deque(maxlen=6),
+    "history_page": 0,
     "last_score": None,
 }.items():
     if key not in st.session_state:
         st.session_state[key] = default
 
+history = st.session_state.comments
+
 video, chat = st.columns([3,1])
 
 # 🎥 CAMERA
 with video:
     st.subheader("Live Camera")
     if st.session_state.live:
+        # webrtc (aiortc, av) is only imported once a stream goes live
+        from streamlit_webrtc import webrtc_streamer
         webrtc_streamer(key="live_stream")
     else:
         st.warning("Camera off")
@@ -184,64 +167,87 @@ with video:
 # 💬 CHAT
 with chat:
     st.subheader("Live Chat")
-    for c in st.session_state.comments:
-        user = users[c["user"]]
-        st.markdown(f"""
-        <div class="chat-card {c['class']}">
-            <img src="{user['avatar']}" width="40" style="border-radius:50%">
-            <div>
-                <b>{c['user']}</b> • {c['time']}<br>
-                {c['text']}
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
+
+    page = st.session_state.history_page
+    older_col, newer_col = st.columns(2)
+    if older_col.button("⬆ Older", disabled=page >= history.pages()):
+        st.session_state.history_page += 1
+        st.rerun()
+    if newer_col.button("⬇ Newer", disabled=page == 0):
+        st.session_state.history_page -= 1
+        st.rerun()
+
+    if page:
+        st.markdown("".join(m["html"] for m in history.older(page)), unsafe_allow_html=True)
+    else:
+        st.markdown(history.html(), unsafe_allow_html=True)
 
 # FLOATING EMOJIS
 overlay = '<div class="overlay">'
-for e in st.session_state.floating[-6:]:
+for e in st.session_state.floating:
     overlay += f'<div class="float" style="left:{random.randint(0,200)}px;">{e}</div>'
 overlay += '</div>'
 st.markdown(overlay, unsafe_allow_html=True)
 
 # ---------------- COMMENT INPUT ----------------
 st.write("---")
+# limits and the audit log are keyed on a per-visitor id kept in the URL,
+# not on the chat name anyone can pick: reloading the page does not reset
+# a mute or a throttle, and visitors never share or move each other's
+if not re.fullmatch(r"[0-9a-f]{32}", st.query_params.get("sid", "")):
+    st.query_params["sid"] = uuid.uuid4().hex
+user_id = st.query_params["sid"]
+name = st.selectbox("Chat as", list(users), key="username")
 comment = st.text_input("Add a comment", disabled=not st.session_state.live)
 
-if comment:
-    st.caption(f"Sentiment: {sentiment(comment)}")
+# muted users never reach the model, not even for the caption
+muted = limits.status(user_id)["muted"]
+
+if comment and not muted:
+    # one memoized analysis per comment text, shared by the caption and Send
+    st.caption(f"Sentiment: {get_engine().analyze(comment).sentiment}")
 
 if st.button("Send", disabled=not st.session_state.live):
 
-    score = toxicity_score(clean_text(comment))
-    percent = int(score * 100)
-    st.session_state.last_score = percent
+    admitted = limits.admit(user_id)
 
-    if score <= 0.01:
-        css = "safe"
-        st.success("Posted")
+    if admitted == "mute":
+        st.error("🔇 Muted for repeated harmful messages")
 
-    elif score < 0.03:
-        css = "warn"
-        st.warning("⚠️ Consider editing")
+    elif admitted == "throttle":
+        st.warning("⏳ Slow down, you are sending too fast")
 
     else:
-        css = "block"
-        st.error("🚫 Harmful message blocked")
-        st.session_state.warnings += 1
+        engine = get_engine()
+        analysis = engine.analyze(comment)
+        percent = int(analysis.score * 100)
+        st.session_state.last_score = percent
+        css = analysis.verdict
+        limits.record(user_id, css)
+        moderation_log.record_analysis(analysis, user_id, engine.version, name=name)
 
-    if css != "block":
-        st.session_state.comments.append({
-            "user": "You",
-            "text": comment,
-            "time": datetime.now().strftime("%H:%M"),
-            "class": css
-        })
+        if css == "safe":
+            st.success("Posted")
 
-    st.rerun()
+        elif css == "warn":
+            st.warning("⚠️ Consider editing")
+
+        else:
+            st.error("🚫 Harmful message blocked")
+
+        if css != "block":
+            history.append(name, comment, css, time=datetime.now().strftime("%H:%M"))
+            st.session_state.history_page = 0
+
+        st.rerun()
 
 # SHOW METER AFTER RERUN
 if st.session_state.last_score is not None:
     st.progress(st.session_state.last_score)
     st.write(f"Toxicity Level: {st.session_state.last_score}%")
 
-st.write(f"⚠️ Warnings: {st.session_state.warnings}")
\ No newline at end of file
+status = limits.status(user_id)
+st.write(f"⚠️ Warnings: {status['strikes']} (offense score {status['offense']:.1f})")
+
+# page is drawn: warm the moderation engine for the first comment
+preload_engine()
@@ -1,10 +1,8 @@
 import streamlit as st
 import joblib
 import re
-import emoji
 from datetime import datetime
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
+from cleaning import clean_text
 from streamlit_webrtc import webrtc_streamer
 import random
 import math
@@ -13,21 +11,8 @@ import math
 model = joblib.load("models/best_model.pkl")
 vectorizer = joblib.load("models/tfidf_vectorizer.pkl")
 
-stop_words = set(stopwords.words('english'))
-lemmatizer = WordNetLemmatizer()
-
 bad_words = ["stupid","idiot","hate","die","loser","ugly","dumb"]
 
-# ---------------- TEXT CLEANING ----------------
-def clean_text(text):
-    text = text.lower()
-    text = re.sub(r'http\S+|www\S+', '', text)
-    text = emoji.replace_emoji(text, replace='')
-    text = re.sub(r'[^a-z\s]', '', text)
-    words = text.split()
-    words = [lemmatizer.lemmatize(w) for w in words if w not in stop_words]
-    return " ".join(words)
-
 # ---------------- TOXICITY SCORE ----------------
 def toxicity_score(text):
     vec = vectorizer.transform([text])
@@ -0,0 +1,193 @@
+# Per-user offense scores and rate limits.
+#
+# Each chatter gets one slot in a set of flat numpy arrays: an offense
+# score that halves every `half_life` seconds, a block counter and a
+# token bucket. Decay and refill are applied lazily when a slot is
+# touched, so every call is O(1) and a few hundred thousand active users
+# cost a few MB. admit() runs before the model: muted users are rejected
+# outright, and repeat offenders get a slower bucket, so abuse spikes
+# cost less inference. Slots of users with nothing left to remember (no
+# offense, full bucket) are freed every PRUNE_SECONDS and before the
+# arrays grow, so a long-running process does not keep one per visitor.
+import threading
+import time
+import numpy as np
+
+HALF_LIFE_SECONDS = 600
+# offense added per verdict
+OFFENSE_WEIGHTS = {"safe": 0.0, "warn": 0.5, "block": 1.0}
+# offense at which the bucket refills at half speed / the user is muted
+SLOW_AT = 2.0
+MUTE_AT = 4.0
+
+RATE = 0.5      # messages per second
+BURST = 5       # bucket size
+CAPACITY = 1024
+PRUNE_SECONDS = 60
+
+# per-user columns; a slot is reset when a user is assigned to it
+FIELDS = [
+    ("offense", np.float32),
+    ("offense_at", np.float64),
+    ("tokens", np.float32),
+    ("tokens_at", np.float64),
+    ("strikes", np.int32),
+]
+
+
+class UserLimits:
+
+    def __init__(self, half_life=HALF_LIFE_SECONDS, rate=RATE, burst=BURST,
+                 slow_at=SLOW_AT, mute_at=MUTE_AT, capacity=CAPACITY, prune_seconds=PRUNE_SECONDS):
+        self.half_life = half_life
+        self.rate = rate
+        self.burst = burst
+        self.slow_at = slow_at
+        self.mute_at = mute_at
+        self.prune_seconds = prune_seconds
+        self._pruned_at = time.monotonic()
+
+        self._slots = {}
+        self._users = []
+        self._free = []
+        self._lock = threading.Lock()
+        self._allocate(capacity)
+
+        self.admitted = 0
+        self.throttled = 0
+        self.muted = 0
+
+    # ---------------- SLOTS ----------------
+    def _allocate(self, capacity):
+        # grow every column to `capacity` slots, keeping existing users
+        old = len(self._users)
+
+        for name, dtype in FIELDS:
+            column = np.zeros(capacity, dtype=dtype)
+            if old:
+                column[:old] = getattr(self, name)
+            setattr(self, name, column)
+
+        self._users.extend([None] * (capacity - old))
+        self._free.extend(range(capacity - 1, old - 1, -1))
+
+    def _slot(self, user, now):
+        slot = self._slots.get(user)
+        if slot is None:
+            if not self._free and not self._prune(now):
+                self._allocate(2 * len(self._users))
+            slot = self._slots[user] = self._free.pop()
+            self._users[slot] = user
+            self.offense[slot] = 0.0
+            self.offense_at[slot] = now
+            self.tokens[slot] = self.burst
+            self.tokens_at[slot] = now
+            self.strikes[slot] = 0
+        return slot
+
+    def _decayed(self, slot, now):
+        elapsed = now - self.offense_at[slot]
+        offense = self.offense[slot] * 0.5 ** (elapsed / self.half_life)
+        self.offense[slot] = offense
+        self.offense_at[slot] = now
+        return offense
+
+    # ---------------- API ----------------
+    def admit(self, user, now=None):
+        # "allow", "throttle" (bucket empty) or "mute" (offense too high)
+        now = time.monotonic() if now is None else now
+
+        with self._lock:
+            if now - self._pruned_at >= self.prune_seconds:
+                self._prune(now)
+
+            slot = self._slot(user, now)
+            offense = self._decayed(slot, now)
+
+            if offense >= self.mute_at:
+                self.muted += 1
+                return "mute"
+
+            rate = self.rate / 2 if offense >= self.slow_at else self.rate
+            tokens = min(self.burst, self.tokens[slot] + (now - self.tokens_at[slot]) * rate)
+            self.tokens_at[slot] = now
+
+            if tokens < 1:
+                self.tokens[slot] = tokens
+                self.throttled += 1
+                return "throttle"
+
+            self.tokens[slot] = tokens - 1
+            self.admitted += 1
+            return "allow"
+
+    def record(self, user, verdict, now=None):
+        now = time.monotonic() if now is None else now
+
+        with self._lock:
+            slot = self._slot(user, now)
+            self.offense[slot] = self._decayed(slot, now) + OFFENSE_WEIGHTS[verdict]
+            if verdict == "block":
+                self.strikes[slot] += 1
+            return float(self.offense[slot])
+
+    def status(self, user, now=None):
+        now = time.monotonic() if now is None else now
+
+        with self._lock:
+            slot = self._slots.get(user)
+            if slot is None:
+                return {"offense": 0.0, "strikes": 0, "muted": False}
+
+            offense = float(self._decayed(slot, now))
+            return {"offense": offense, "strikes": int(self.strikes[slot]), "muted": offense >= self.mute_at}
+
+    def prune(self, now=None, min_offense=0.01):
+        now = time.monotonic() if now is None else now
+
+        with self._lock:
+            return self._prune(now, min_offense)
+
+    def _prune(self, now, min_offense=0.01):
+        # free the slots of users with no offense left and a full bucket
+        self._pruned_at = now
+        used = np.array(sorted(self._slots.values()), dtype=np.int64)
+        if not len(used):
+            return 0
+
+        offense = self.offense[used] * 0.5 ** ((now - self.offense_at[used]) / self.half_life)
+        tokens = self.tokens[used] + (now - self.tokens_at[used]) * self.rate
+        idle = used[(offense < min_offense) & (tokens >= self.burst)]
+
+        for slot in idle.tolist():
+            del self._slots[self._users[slot]]
+            self._users[slot] = None
+            self._free.append(slot)
+
+        return len(idle)
+
+    def __len__(self):
+        return len(self._slots)
+
+    def stats(self):
+        return {
+            "users": len(self._slots),
+            "capacity": len(self._users),
+            "admitted": self.admitted,
+            "throttled": self.throttled,
+            "muted": self.muted,
+        }
+
+
+# ---------------- SHARED LIMITS ----------------
+# one table per process, shared by every Streamlit session
+_limits = None
+_limits_lock = threading.Lock()
+
+
+def get_limits():
+    global _limits
+    with _limits_lock:
+        if _limits is None:
+            _limits = UserLimits()
+        return _limits